@@ -0,0 +1,160 @@
+import sys
+import json
+
+import numpy as np
+
+from . import consts
+from .storage import CENSORED_DTYPE, COLUMN_DTYPE, SimulationResults
+
+from typing import Callable, Dict, List, NamedTuple, Union
+
+"""
+In-process simulation backends, each one returns the `trial_count` trials
+`trial_offset ..` of a config as arrays (no subprocess, no JSON file):
+
+    run(trial_count, n, p0, s0, tr, beta, seed, max_cycles=None, trial_offset=0, **options)
+        -> SimulationResults
+
+Python backends pass `options` on to `stream_trials` (e.g. a shared
+`executor`), other backends ignore them.
+"""
+
+
+class Backend(NamedTuple):
+    run: Callable[..., SimulationResults]
+    supports: Callable[[int, float, int, int, float], bool]  # (n, p0, s0, tr, beta)
+
+
+BACKENDS: Dict[str, Backend] = {}
+
+
+def register_backend(name: str, run: Callable[..., SimulationResults],
+                     supports: Union[Callable[[int, float, int, int, float], bool], None] = None):
+    BACKENDS[name] = Backend(run, supports or (lambda *config: True))
+
+
+def _python_simulator():
+    if consts.ROOT_DIR not in sys.path:
+        sys.path.append(consts.ROOT_DIR)
+
+    from simulators.python import simulator
+    return simulator
+
+
+def _python_backend(name: str) -> Callable[..., SimulationResults]:
+    def run(trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int,
+            max_cycles: Union[int, None] = None, trial_offset: int = 0, **kwargs) -> SimulationResults:
+        simulator = _python_simulator()
+
+        results = np.empty(trial_count, dtype=COLUMN_DTYPE)
+        results_z = np.empty(trial_count, dtype=COLUMN_DTYPE)
+        censored = np.empty(trial_count, dtype=CENSORED_DTYPE)
+
+        position = 0
+        for chunk, chunk_z, chunk_censored in simulator.stream_trials(
+                trial_count, n, p0, s0, tr, beta, seed, backend=name, trial_offset=trial_offset,
+                max_cycles=max_cycles, **kwargs):
+            results[position:position + len(chunk)] = chunk
+            results_z[position:position + len(chunk)] = chunk_z
+            censored[position:position + len(chunk)] = chunk_censored
+            position += len(chunk)
+
+        # Fewer trials when a `time_budget` ran out
+        return SimulationResults(
+            trial_count=position,
+            configs=simulator.trial_configs(n, p0, s0, tr, beta, seed, name, max_cycles),
+            results=results[:position],
+            results_z=results_z[:position],
+            censored=censored[:position],
+        )
+
+    return run
+
+
+def _run_rusty(trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int,
+               max_cycles: Union[int, None] = None, trial_offset: int = 0, **options) -> SimulationResults:
+    from rustysimulator import simulate
+
+    data = json.loads(simulate(trial_count, n, p0, s0, tr, beta, seed,
+                               -1 if max_cycles is None else max_cycles, trial_offset))
+    for name in ('results', 'results_z'):
+        data[name] = np.asarray(data[name], dtype=COLUMN_DTYPE)
+
+    return SimulationResults(data)
+
+
+register_backend('python', _python_backend('python'))
+register_backend('events', _python_backend('events'),
+                 supports=lambda n, p0, s0, tr, beta: p0 > 0 or beta > 0)
+register_backend('counting', _python_backend('counting'),
+                 supports=lambda n, p0, s0, tr, beta: beta == 0 and p0 > 0)
+register_backend('batched', _python_backend('batched'))
+register_backend('arrays', _python_backend('arrays'))
+register_backend('rusty', _run_rusty)
+
+
+def select_backend(backend: str, n: int, p0: float, s0: int, tr: int, beta: float) -> str:
+    """Resolve `backend='auto'` to the fastest backend supporting the config,
+    with the same policy as the simulator's entry points"""
+    if backend != 'auto':
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        return backend
+
+    return _python_simulator().select_backend(backend, n, p0, s0, tr, beta)
+
+
+def run_backend(backend: str, trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int,
+                max_cycles: Union[int, None] = None, trial_offset: int = 0, **options) -> SimulationResults:
+    """Simulate in-process with a backend by name, or picked by config with 'auto'"""
+    name = select_backend(backend, n, p0, s0, tr, beta)
+    return BACKENDS[name].run(trial_count, n, p0, s0, tr, beta, seed,
+                              max_cycles=max_cycles, trial_offset=trial_offset, **options)
+
+
+def trial_executor(**kwargs):
+    """Persistent pool of the python backends (see `simulator.TrialExecutor`)"""
+    return _python_simulator().TrialExecutor(**kwargs)
+
+
+def check_parity(n: int, p0: float, s0: int, tr: int, beta: float = 0.0,
+                 backends: Union[List[str], None] = None, reference: str = 'python',
+                 trial_count: int = 2000, seed: int = 1984, alpha: float = 0.01) -> Dict[str, dict]:
+    """Check that backends agree in distribution with `reference`
+
+    Every backend supporting the config simulates `trial_count` trials with its
+    own seed, and both result columns are compared against the reference with a
+    two-sample Kolmogorov-Smirnov test (the distributions are discrete, which
+    makes the test conservative).
+
+    Returns:
+        dict: `{backend: {'results', 'results_z': p-value, 'agree': bool}}`
+    """
+
+    from scipy.stats import ks_2samp
+
+    if backends is None:
+        backends = [name for name in BACKENDS if name != reference]
+
+    expected = run_backend(reference, trial_count, n, p0, s0, tr, beta, seed)
+
+    report = {}
+    for i, name in enumerate(backends):
+        if not BACKENDS[name].supports(n, p0, s0, tr, beta):
+            continue
+
+        try:
+            data = run_backend(name, trial_count, n, p0,
+                               s0, tr, beta, seed + i + 1)
+        except ImportError:
+            # Optional backend not built
+            continue
+
+        report[name] = {
+            field: ks_2samp(data[field], expected[field]).pvalue
+            for field in ('results', 'results_z')
+        }
+        report[name]['agree'] = min(report[name]['results'],
+                                    report[name]['results_z']) >= alpha
+
+    return report
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import contextlib
+
+from typing import Callable, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows, the index is left unlocked
+    fcntl = None
+
+"""
+Content-addressed datasets cache:
+    index.json   {key: {'params', 'size', 'last_access'}}
+    .lock        lock file guarding index read-modify-write cycles
+    <key>/       dataset directory, key = hash of every output-affecting parameter
+
+Datasets are built in a temporary directory and renamed into place, and the
+index is replaced atomically, so concurrent notebook kernels never observe a
+half-written entry.
+"""
+
+# Part of every key, bumped whenever the same parameters simulate different
+# trials (e.g. new random streams), so cached datasets are never extended with
+# trials of another scheme. 2: per-trial Philox streams
+CACHE_VERSION = 2
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.lock'
+
+
+def cache_key(params: dict) -> str:
+    """Stable hash of a JSON-like parameters dict"""
+    payload = json.dumps({'version': CACHE_VERSION, **params},
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(path) for f in files)
+
+
+class DatasetCache:
+    """LRU-evicted datasets cache bounded by `budget` bytes"""
+
+    def __init__(self, root: str, budget: Union[int, None] = None):
+        self.root = root
+        self.budget = budget
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    @contextlib.contextmanager
+    def _locked_index(self):
+        with open(os.path.join(self.root, LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                index = self._read_index()
+                yield index
+                self._write_index(index)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.root, f'.{key}.lock')
+
+    def _open_entry_lock(self, key: str, blocking: bool = True):
+        """Open and lock an entry's lock file, None when `blocking` is False and
+        the entry is already locked"""
+        path = self._lock_path(key)
+        while True:
+            lock = open(path, 'a')
+            if fcntl is None:
+                return lock
+
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return None
+
+            # The lock file may have been deleted by an eviction while waiting
+            try:
+                if os.stat(path).st_ino == os.fstat(lock.fileno()).st_ino:
+                    return lock
+            except FileNotFoundError:
+                pass
+            lock.close()
+
+    @contextlib.contextmanager
+    def entry_lock(self, key: str):
+        """Exclusive lock on one entry, held while generating, extending or
+        loading it (evictions skip locked entries)"""
+        lock = self._open_entry_lock(key)
+        try:
+            yield
+        finally:
+            # Closing the file releases the lock
+            lock.close()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: dict):
+        index_path = os.path.join(self.root, INDEX_FILE)
+        tmp_path = f'{index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, index_path)
+
+    def get(self, key: str) -> Union[str, None]:
+        """Path of a cached dataset (marking it as recently used), or None"""
+        path = self.path(key)
+
+        with self._locked_index() as index:
+            if key not in index or not os.path.isdir(path):
+                index.pop(key, None)
+                return None
+
+            index[key]['last_access'] = time.time()
+            return path
+
+    def put(self, key: str, params: dict, build: Callable[[str], None]) -> str:
+        """Build a dataset into the cache, `build(path)` must create `path` atomically"""
+        path = self.path(key)
+
+        # Move a previous dataset out of the way (forced recreation)
+        if os.path.isdir(path):
+            stale_path = f'{path}.{os.getpid()}.stale'
+            os.replace(path, stale_path)
+            shutil.rmtree(stale_path, ignore_errors=True)
+
+        try:
+            build(path)
+        except OSError:
+            # Another kernel renamed the same dataset into place first
+            if not os.path.isdir(path):
+                raise
+
+        self.refresh(key, params)
+        return path
+
+    def refresh(self, key: str, params: dict):
+        """Record an entry's current size (after building or growing it) and evict"""
+        with self._locked_index() as index:
+            index[key] = {
+                'params': params,
+                'size': _dir_size(self.path(key)),
+                'last_access': time.time(),
+            }
+            self._evict(index, keep=key)
+
+    def _evict(self, index: dict, keep: str):
+        if self.budget is None:
+            return
+
+        total = sum(entry['size'] for entry in index.values())
+        by_age = sorted(index, key=lambda k: index[k]['last_access'])
+        for key in by_age:
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+
+            lock = self._open_entry_lock(key, blocking=False)
+            if lock is None:
+                # In use by another kernel
+                continue
+
+            try:
+                total -= index.pop(key)['size']
+                shutil.rmtree(self.path(key), ignore_errors=True)
+                # Kernels waiting on the removed lock file retry on a new one
+                with contextlib.suppress(OSError):
+                    os.remove(self._lock_path(key))
+            finally:
+                lock.close()
@@ -3,3 +3,7 @@ import os
 DEFAULT_DATASETS_DIR = '../datasets/'
 AUTO_GENERATED_DATASETS_DIR = os.path.join(DEFAULT_DATASETS_DIR, 'auto')
 SIMULATOR_EXECUTABLE_PATH = '../simulators/rust/target/release/simulator-rs'
+# Repository root, `simulators.python` is imported as a package from there
+ROOT_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+DATASETS_CACHE_BUDGET = 8 * 1024 ** 3  # bytes
@@ -0,0 +1,175 @@
+import numpy as np
+import scipy.stats as st
+
+from .models import tnbinom
+
+from typing import Dict, List, Sequence, Tuple, Union
+
+"""
+Goodness-of-fit of simulated trials against a discrete model (`tnbinom` by
+default), for many `(sample, params)` pairs at once:
+
+    chisquare_tests   binned chi-square, low-count bins merged
+    ks_tests          Kolmogorov-Smirnov on the integer support
+    mean_tests        z-test of the sample mean against the model mean
+
+Model probabilities of every set are computed with a single broadcast
+`model.pmf` / `model.cdf` call over the support `0 .. 2 max(sample)`.
+"""
+
+
+def _as_samples(samples) -> List[np.ndarray]:
+    return [np.asarray(sample, dtype=np.int64).ravel() for sample in samples]
+
+
+def _as_params(params, count: int) -> np.ndarray:
+    params = np.asarray(params, dtype=float)
+    if params.ndim == 1:
+        params = np.broadcast_to(params, (count, len(params)))
+    if len(params) != count:
+        raise ValueError("one parameter set per sample is required")
+    return params
+
+
+def _support_sizes(samples: List[np.ndarray]) -> np.ndarray:
+    # Support tested for each sample, `0 .. 2 max` as in the notebook
+    return np.array([2 * int(sample.max()) + 1 for sample in samples])
+
+
+def _model_table(method, params: np.ndarray, size: int) -> np.ndarray:
+    # (sets, size) table of `method(k, *params)`, one broadcast call
+    k = np.arange(size)[None, :]
+    return method(k, *(params[:, [j]] for j in range(params.shape[1])))
+
+
+def frequency_tables(samples: Sequence, params, model=tnbinom) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Observed and expected counts of every sample over `0 .. 2 max(sample)`
+
+    The last expected count also holds the model mass above the support, so
+    both tables of a sample add up to its size.
+    """
+    samples = _as_samples(samples)
+    params = _as_params(params, len(samples))
+    sizes = _support_sizes(samples)
+
+    pmf = _model_table(model.pmf, params, int(sizes.max()))
+
+    observed = []
+    expected = []
+    for sample, size, row in zip(samples, sizes, pmf):
+        counts = np.bincount(sample, minlength=size)
+        expectation = row[:size] * len(sample)
+        expectation[-1] += len(sample) - expectation.sum()
+
+        observed.append(counts)
+        expected.append(expectation)
+
+    return observed, expected
+
+
+def merge_bins(observed: np.ndarray, expected: np.ndarray,
+               threshold: int = 5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merge consecutive bins until each holds at least `threshold` observations
+
+    Same bins as the notebook's `chisquare_test` loop: a bin is closed as soon
+    as its observed count reaches `threshold`, leftovers join the last bin.
+    Bin ends are found with `np.searchsorted` on the cumulative counts, and
+    bins summed with `np.add.reduceat`.
+
+    Returns:
+        tuple: `(starts, observed, expected)` of the merged bins
+    """
+    observed = np.asarray(observed)
+    expected = np.asarray(expected, dtype=float)
+
+    cumulative = np.cumsum(observed)
+    ends = []
+    base = 0
+    while True:
+        end = int(np.searchsorted(cumulative, base + threshold, side='left'))
+        if end >= len(cumulative):
+            break
+        ends.append(end)
+        base = cumulative[end]
+
+    if not ends:
+        # Too few observations for a single bin
+        return np.zeros(1, dtype=np.int64), observed.sum(keepdims=True), expected.sum(keepdims=True)
+
+    starts = np.concatenate([[0], np.asarray(ends[:-1]) + 1]).astype(np.int64)
+    return starts, np.add.reduceat(observed, starts), np.add.reduceat(expected, starts)
+
+
+def chisquare_tests(samples: Sequence, params, model=tnbinom, threshold: int = 5) -> Dict[str, np.ndarray]:
+    """Chi-square test of every sample against `model(*params)`
+
+    `params` holds one parameter set per sample (or one shared by all).
+
+    Returns:
+        dict: `{'statistic', 'pvalue', 'dof'}` arrays, one element per sample
+    """
+    observed, expected = frequency_tables(samples, params, model)
+
+    statistic = np.empty(len(observed))
+    dof = np.empty(len(observed), dtype=np.int64)
+    for i, (counts, expectation) in enumerate(zip(observed, expected)):
+        _, counts, expectation = merge_bins(counts, expectation, threshold)
+        statistic[i] = np.sum((counts - expectation) ** 2 / expectation)
+        dof[i] = len(counts) - 1
+
+    pvalue = st.chi2.sf(statistic, np.maximum(dof, 1))
+    return {'statistic': statistic, 'pvalue': pvalue, 'dof': dof}
+
+
+def ks_tests(samples: Sequence, params, model=tnbinom) -> Dict[str, np.ndarray]:
+    """Kolmogorov-Smirnov test of every sample against `model(*params)`
+
+    Both CDFs are step functions on the integers, so the distance is the
+    largest gap at the support points (and above the support). P-values use
+    the continuous `kstwo` distribution, which is conservative for discrete
+    models.
+
+    Returns:
+        dict: `{'statistic', 'pvalue'}` arrays, one element per sample
+    """
+    samples = _as_samples(samples)
+    params = _as_params(params, len(samples))
+    sizes = _support_sizes(samples)
+
+    cdf = _model_table(model.cdf, params, int(sizes.max()))
+
+    statistic = np.empty(len(samples))
+    for i, (sample, size) in enumerate(zip(samples, sizes)):
+        empirical = np.cumsum(np.bincount(sample, minlength=size)) / len(sample)
+        gap = np.abs(empirical - cdf[i, :size])
+        statistic[i] = max(gap.max(), 1 - cdf[i, size - 1])
+
+    counts = np.array([len(sample) for sample in samples])
+    return {'statistic': statistic, 'pvalue': st.kstwo.sf(statistic, counts)}
+
+
+def mean_tests(samples: Sequence, params, model=tnbinom,
+               correction: Union[float, np.ndarray] = 0.0) -> Dict[str, np.ndarray]:
+    """Two-sided z-test of every sample mean against the model mean
+
+    The sample standard deviation (ddof=1) estimates the model one,
+    `correction` is added to the model means.
+
+    Returns:
+        dict: `{'sample_mean', 'model_mean', 'statistic', 'pvalue'}` arrays
+    """
+    samples = _as_samples(samples)
+    params = _as_params(params, len(samples))
+
+    sample_mean = np.array([sample.mean() for sample in samples])
+    sample_std = np.array([sample.std(ddof=1) for sample in samples])
+    counts = np.array([len(sample) for sample in samples])
+
+    model_mean = model.mean(*params.T) + correction
+    statistic = (model_mean - sample_mean) * np.sqrt(counts) / sample_std
+    return {
+        'sample_mean': sample_mean,
+        'model_mean': model_mean,
+        'statistic': statistic,
+        'pvalue': 2 * st.norm.cdf(-np.abs(statistic)),
+    }
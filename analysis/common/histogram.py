@@ -0,0 +1,169 @@
+import numpy as np
+
+from typing import Iterable, Union
+
+
+class Histogram:
+    """Mergeable histogram of integer samples, backed by `np.bincount`
+
+    Bin `i` covers `[origin + i * bin_size, origin + (i + 1) * bin_size)`, only
+    the range between the first and last non-empty bins is stored (`first` is
+    the index of `counts[0]`). Samples outside `[start, end)` are clipped: they
+    are only counted in `underflow` / `overflow`.
+
+    Histograms with the same `bin_size`, `origin` and clipping range merge by
+    adding their counts, so chunks of a streaming or parallel run can be
+    combined without keeping the raw samples.
+    """
+
+    bin_size: int
+    origin: int
+    start: Union[int, None]
+    end: Union[int, None]
+
+    first: int
+    counts: np.ndarray
+    underflow: int
+    overflow: int
+
+    def __init__(self, bin_size: int = 1, origin: int = 0,
+                 start: Union[int, None] = None, end: Union[int, None] = None):
+        if bin_size < 1:
+            raise ValueError("bin_size must be positive")
+
+        self.bin_size = int(bin_size)
+        self.origin = int(origin)
+        self.start = None if start is None else int(start)
+        self.end = None if end is None else int(end)
+
+        self.first = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @classmethod
+    def from_values(cls, values: Iterable[int], bin_size: int = 1, origin: int = 0,
+                    start: Union[int, None] = None, end: Union[int, None] = None) -> 'Histogram':
+        hist = cls(bin_size, origin, start, end)
+        hist.update(values)
+        return hist
+
+    @property
+    def total(self) -> int:
+        """Number of samples, clipped ones included"""
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def _compatible(self, other: 'Histogram') -> bool:
+        return (self.bin_size, self.origin, self.start, self.end) == \
+            (other.bin_size, other.origin, other.start, other.end)
+
+    def _add_counts(self, first: int, counts: np.ndarray):
+        if len(counts) == 0:
+            return
+        if len(self.counts) == 0:
+            self.first, self.counts = first, counts.astype(np.int64)
+            return
+
+        low = min(self.first, first)
+        high = max(self.first + len(self.counts), first + len(counts))
+        merged = np.zeros(high - low, dtype=np.int64)
+        merged[self.first - low:self.first - low + len(self.counts)] += self.counts
+        merged[first - low:first - low + len(counts)] += counts
+        self.first, self.counts = low, merged
+
+    def update(self, values: Iterable[int]) -> 'Histogram':
+        """Add samples in place"""
+        values = np.asarray(values, dtype=np.int64).ravel()
+
+        if self.start is not None:
+            below = values < self.start
+            self.underflow += int(np.count_nonzero(below))
+            values = values[~below]
+        if self.end is not None:
+            above = values >= self.end
+            self.overflow += int(np.count_nonzero(above))
+            values = values[~above]
+
+        if len(values) > 0:
+            index = (values - self.origin) // self.bin_size
+            first = int(index.min())
+            self._add_counts(first, np.bincount(index - first))
+
+        return self
+
+    def merge(self, *others: 'Histogram') -> 'Histogram':
+        """Add the counts of other histograms in place"""
+        for other in others:
+            if not self._compatible(other):
+                raise ValueError("histograms must share bin_size, origin and clipping")
+
+            self._add_counts(other.first, other.counts)
+            self.underflow += other.underflow
+            self.overflow += other.overflow
+
+        return self
+
+    def __add__(self, other: 'Histogram') -> 'Histogram':
+        return self.copy().merge(other)
+
+    def copy(self) -> 'Histogram':
+        hist = Histogram(self.bin_size, self.origin, self.start, self.end)
+        hist.first = self.first
+        hist.counts = self.counts.copy()
+        hist.underflow = self.underflow
+        hist.overflow = self.overflow
+        return hist
+
+    def rebin(self, bin_size: int) -> 'Histogram':
+        """New histogram with bins grouping `bin_size / self.bin_size` current ones"""
+        if bin_size % self.bin_size != 0:
+            raise ValueError("bin_size must be a multiple of the current bin size")
+
+        hist = Histogram(bin_size, self.origin, self.start, self.end)
+        hist.underflow = self.underflow
+        hist.overflow = self.overflow
+
+        if len(self.counts) > 0:
+            factor = bin_size // self.bin_size
+            index = np.arange(self.first, self.first + len(self.counts)) // factor
+            hist.first = int(index[0])
+            hist.counts = np.bincount(
+                index - hist.first, weights=self.counts).astype(np.int64)
+
+        return hist
+
+    def clip(self, start: Union[int, None] = None, end: Union[int, None] = None) -> 'Histogram':
+        """New histogram only binning `[start, end)`, both on bin edges"""
+        hist = self.copy()
+        hist.start, hist.end = start, end
+        index = np.arange(self.first, self.first + len(self.counts))
+        edges = self.origin + index * self.bin_size
+
+        keep = np.ones(len(index), dtype=bool)
+        if start is not None:
+            keep &= edges >= start
+            hist.underflow += int(self.counts[edges < start].sum())
+        if end is not None:
+            keep &= edges + self.bin_size <= end
+            hist.overflow += int(self.counts[edges + self.bin_size > end].sum())
+
+        kept = np.flatnonzero(keep)
+        if len(kept) == 0:
+            hist.first, hist.counts = 0, np.zeros(0, dtype=np.int64)
+        else:
+            hist.first = self.first + int(kept[0])
+            hist.counts = self.counts[kept[0]:kept[-1] + 1].copy()
+
+        return hist
+
+    def edges(self) -> np.ndarray:
+        """Left edge of every stored bin"""
+        return self.origin + np.arange(self.first, self.first + len(self.counts)) * self.bin_size
+
+    def probabilities(self) -> np.ndarray:
+        """Fraction of all samples falling in each bin"""
+        return self.counts / max(self.total, 1)
+
+    def density(self) -> np.ndarray:
+        """Probability density of each bin (fraction of samples per unit)"""
+        return self.probabilities() / self.bin_size
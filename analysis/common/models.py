@@ -1,81 +1,104 @@
+import functools
+
 import scipy.stats as st
 import numpy as np
 from scipy.stats._discrete_distns import nbinom_gen
 
-from typing import List, Union
+from typing import Union
+
+
+# Tables are only grown up to this many k, larger k are computed directly
+TABLE_MAX_SIZE = 1 << 22
+
+
+class ProbabilityTable:
+    """`tnbinom` CDF over `k = 0 .. len - 1` for fixed `(n, s0, p)`, grown on demand"""
+
+    def __init__(self, n: int, s0: int, p: float):
+        self.n = n
+        self.s0 = s0
+        self.p = p
+
+        self._cdf = np.empty(0)
+
+    def _grow(self, size: int):
+        size = min(max(size, 2 * len(self._cdf), 64), TABLE_MAX_SIZE)
+        k = np.arange(len(self._cdf), size)
+        s = self.s0 + 1
+        self._cdf = np.concatenate(
+            [self._cdf, st.nbinom.cdf(self.n * k - s, s, self.p)])
+
+    def cdf(self, k) -> np.ndarray:
+        k = np.asarray(k, dtype=np.int64)
+        top = int(k.max(initial=0))
+        if top >= len(self._cdf) and top < TABLE_MAX_SIZE:
+            self._grow(top + 1)
 
+        s = self.s0 + 1
+        if len(self._cdf) == 0:
+            # Only k past the largest table so far, nothing to look up
+            return np.where(k < 0, 0.0, st.nbinom.cdf(self.n * k - s, s, self.p))
 
-def _try_get(it: Union[List[Union[int, float]], int, float], idx: int):
-    if hasattr(it, '__len__'):
-        if idx < len(it):
-            return it[idx]
-        return it[0]
-    return it
+        inside = k < len(self._cdf)
+        result = np.where(k < 0, 0.0, self._cdf[np.clip(k, 0, len(self._cdf) - 1)])
+        if not inside.all():
+            result[~inside] = st.nbinom.cdf(self.n * k[~inside] - s, s, self.p)
+        return result
+
+    def pmf(self, k) -> np.ndarray:
+        k = np.asarray(k, dtype=np.int64)
+        return self.cdf(k) - self.cdf(k - 1)
+
+
+@functools.lru_cache(maxsize=64)
+def probability_table(n: int, s0: int, p: float) -> ProbabilityTable:
+    """Shared table of `tnbinom(n, s0, p)`, least recently used ones are dropped"""
+    return ProbabilityTable(n, s0, p)
+
+
+def _shared_params(*params) -> Union[tuple, None]:
+    # Scalar `(n, s0, p)` when every element uses the same parameters
+    flat = [np.ravel(x) for x in params]
+    if all(len(x) > 0 and (x == x[0]).all() for x in flat):
+        return int(flat[0][0]), int(flat[1][0]), float(flat[2][0])
+    return None
 
 
 class tnbinom_gen(st.rv_discrete):
     """
     Slightly tweaked negative binomial to fit our problem.
+
+    T <= k when at least s = s0 + 1 failures happened in the first n k
+    Bernoulli(p) draws, so the CDF is a single nbinom CDF evaluation and the
+    pmf a difference of two. Every method broadcasts over k/q and parameters,
+    with CDF tables cached per `(n, s0, p)`.
     """
 
     def _pmf(self, k, n, s0, p):
-        # Handle iterable
-        if hasattr(k, '__iter__'):
-            if len(k) != 1:
-                return [self._pmf(j, _try_get(n, i), _try_get(s0, i), _try_get(p, i)) for i, j in enumerate(k)]
-            else:
-                k = k[0]
-                n = n[0]
-                s0 = s0[0]
-                p = p[0]
-
-        # Handle numeric case
+        shared = _shared_params(n, s0, p)
+        if shared is not None:
+            return probability_table(*shared).pmf(k)
+
         s = s0 + 1
-        return sum(st.nbinom.pmf(np.arange(n * (k - 1) + 1, n * k + 1) - s, s, p))
+        cdf = st.nbinom.cdf(np.stack(np.broadcast_arrays(
+            n * k - s, n * (k - 1) - s)), s, p)
+        return cdf[0] - cdf[1]
 
     def _cdf(self, k, n, s0, p):
-        # Handle iterable
-        if hasattr(k, '__iter__'):
-            if len(k) != 1:
-                return [self._cdf(j, _try_get(n, i), _try_get(s0, i), _try_get(p, i)) for i, j in enumerate(k)]
-            else:
-                k = k[0]
-                n = n[0]
-                s0 = s0[0]
-                p = p[0]
-
-        # Handle numeric case
+        shared = _shared_params(n, s0, p)
+        if shared is not None:
+            return probability_table(*shared).cdf(k)
+
         s = s0 + 1
         return st.nbinom.cdf(n * k - s, s, p)
 
     def _ppf(self, q, n, s0, p):
-        if hasattr(q, '__iter__'):
-            if len(q) != 1:
-                return [self._ppf(j, _try_get(n, i), _try_get(s0, i), _try_get(p, i)) for i, j in enumerate(q)]
-            else:
-                q = q[0]
-                n = n[0]
-                s0 = s0[0]
-                p = p[0]
-
-        # Handle numeric case
         s = s0 + 1
         return (st.nbinom.ppf(q, s, p) + s) / n
 
     def _stats(self, n, s0, p):
-        if hasattr(n, '__iter__'):
-            if len(n) != 1:
-                return [self._stats(j, _try_get(s0, i), _try_get(p, i)) for i, j in enumerate(n)]
-            else:
-                n = n[0]
-                s0 = s0[0]
-                p = p[0]
-
-        # Handle numeric case
-        mean = st.nbinom.stats(s0 + 1, p)[0]
-
-        mean += (s0 + 1)
-        mean /= n
+        s = s0 + 1
+        mean = (st.nbinom.stats(s, p, moments='m') + s) / n
 
         # Not sure about variance
         return mean, mean / p, None, None
@@ -94,3 +117,54 @@ class WrappedPPF:
 
     def ppf(self, q):
         return (st.nbinom.ppf(q, self.s, self.p) + self.s) / self.n
+
+
+# Relative distance to a CDF step under which `TablePPF` defers to scipy
+PPF_EDGE_TOLERANCE = 1e-9
+
+
+@functools.lru_cache(maxsize=64)
+def nbinom_cdf_table(s: int, p: float, tail_mass: float = 1e-12) -> np.ndarray:
+    """nbinom(s, p) CDF over 0 .. m, m leaving less than `tail_mass` above it"""
+    m = int(st.nbinom.ppf(1 - tail_mass, s, p))
+    table = st.nbinom.cdf(np.arange(m + 1), s, p)
+    table.flags.writeable = False
+    return table
+
+
+class TablePPF:
+    """Same PPF as `WrappedPPF`, answered by searching a precomputed CDF table
+
+    Tables are shared by every `TablePPF` of the same `(s, p)`, quantiles past
+    the table (within `tail_mass` of 1) fall back to `st.nbinom.ppf`.
+    """
+
+    def __init__(self, n, s, p, tail_mass: float = 1e-12):
+        self.n = n
+        self.s = s + 1
+        self.p = p
+
+        self._cdf = nbinom_cdf_table(int(self.s), float(self.p), tail_mass)
+
+    def ppf(self, q):
+        q = np.asarray(q, dtype=float)
+        shape = q.shape
+        q = q.ravel()
+        m = np.searchsorted(self._cdf, q, side='left').astype(float)
+
+        # Support starts at 0, so q = 0 maps right below it as in scipy
+        m[q == 0] = -1
+
+        outside = (m >= len(self._cdf)) | ~((q >= 0) & (q <= 1))
+
+        # scipy rounds quantiles within a few ulps of a CDF step its own way
+        index = np.clip(m, 0, len(self._cdf) - 1).astype(np.int64)
+        upper = self._cdf[index]
+        lower = np.where(index > 0, self._cdf[index - 1], 0.0)
+        tolerance = PPF_EDGE_TOLERANCE * q
+        outside |= (np.abs(upper - q) <= tolerance) | (np.abs(q - lower) <= tolerance)
+
+        if outside.any():
+            m[outside] = st.nbinom.ppf(q[outside], self.s, self.p)
+
+        return ((m + self.s) / self.n).reshape(shape)[()]
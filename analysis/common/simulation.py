@@ -1,11 +1,16 @@
 import os
 import json
 import time
-from collections import defaultdict
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
 from . import consts
+from .cache import DatasetCache, cache_key
+from .histogram import Histogram
+from .backends import run_backend, select_backend, trial_executor
+from .storage import SimulationResults, is_simulation_dir, load_simulation_binary, save_simulation_binary, append_simulation_binary, slice_simulation
 
 from typing import NamedTuple, Union, List, Tuple
 
@@ -31,6 +36,7 @@ class SimulationResultsType(NamedTuple):
     configs: SimulationConfigsType
     results: List[int]
     results_z: List[int]
+    censored: List[bool]
 
 
 def load_simulation_json(path: str) -> Union[SimulationResultsType, None]:
@@ -50,16 +56,28 @@ def load_simulation_json(path: str) -> Union[SimulationResultsType, None]:
     # Load JSON data
     try:
         with open(path, 'r') as f:
-            data = json.load(f)
-
-            data['results_delta'] = [r - z for r,
-                                     z in zip(data['results'], data['results_z'])]
-
-            return data
+            # `results_delta` is computed on first access
+            return SimulationResults(json.load(f))
     except Exception:
         return None
 
 
+def load_simulation(path: str) -> Union[SimulationResultsType, None]:
+    """Load simulation results from a binary dataset directory or a JSON file
+
+    Args:
+        path (str): Target simulation results path
+
+    Returns:
+        Any[SimulationResultsType, None]: simulation data, may return None on failure
+    """
+
+    if is_simulation_dir(path):
+        return load_simulation_binary(path)
+
+    return load_simulation_json(path)
+
+
 def load_or_generate_simulation(
     trial_count: int,
     n: int,
@@ -72,75 +90,251 @@ def load_or_generate_simulation(
     max_cycles: int = 50000,
     seed: Union[int, None] = None,
     datasets_path=consts.AUTO_GENERATED_DATASETS_DIR,
-    simulator_cmd=consts.SIMULATOR_EXECUTABLE_PATH,
+    simulator_cmd: Union[str, None] = None,
     enable_rusty: bool = False,
+    cache_budget: Union[int, None] = consts.DATASETS_CACHE_BUDGET,
+    backend: str = 'auto',
+    executor=None,
 ) -> Union[SimulationResultsType, None]:
-    if seed is None:
-        seed = int(time.time() * 1000)
-
-    file_name = f'{trial_count}-{n}-{p0}-{s}-{tr}-{beta}-{salt}.json'
-    file_path = os.path.join(datasets_path, file_name)
-
-    # Ensure datasets directory exists
-    os.makedirs(datasets_path, exist_ok=True)
-
-    # Generate new dataset (if necessary)
-    if force_recreation or not os.path.isfile(file_path):
-        if enable_rusty:
-            from rustysimulator import simulate
-            results = simulate(trial_count, n, p0, s0,
-                               tr, beta, seed, max_cycles)
-            with open(file_path, 'w') as f:
-                f.write(results)
-        else:
-            os.system(
-                f'SIM_MAX_CYCLES={int(max_cycles)} {simulator_cmd} {trial_count} {n} {p0} {s} {tr} {beta} > {file_path} 2> /dev/null')
+    """Load simulation results from the datasets cache, generating them on a miss
+
+    Datasets are generated in-process by `backend` (see `common.backends`,
+    'auto' picks the fastest one for the config); `enable_rusty` selects the
+    'rusty' backend and `simulator_cmd` runs an external simulator executable
+    (e.g. `consts.SIMULATOR_EXECUTABLE_PATH`) instead. In-process python
+    backends run on `executor` (a `TrialExecutor`) when given.
+
+    Cached datasets are keyed by a hash of every parameter affecting the output
+    (including `max_cycles`, `seed` and the simulator backend). With `seed=None`
+    any dataset generated for the same `salt` is reused, the seed actually used
+    is kept in its `configs`.
+
+    Trials only depend on the seed and their index, so the trial count is not
+    part of the key: smaller requests slice the cached dataset and larger ones
+    generate the missing trials and append them to it.
+    """
+
+    if simulator_cmd is not None:
+        backend = os.path.basename(simulator_cmd)
+    else:
+        backend = select_backend('rusty' if enable_rusty else backend, n, p0, s, tr, beta)
+
+    params = {
+        'n': int(n),
+        'p0': float(p0),
+        's0': int(s),
+        'tr': int(tr),
+        'beta': float(beta),
+        'max_cycles': None if max_cycles is None else int(max_cycles),
+        'seed': None if seed is None else int(seed),
+        'backend': backend,
+        'salt': salt,
+    }
+
+    cache = DatasetCache(datasets_path, budget=cache_budget)
+    key = cache_key(params)
+    json_path = os.path.join(datasets_path, f'{key}.{os.getpid()}.json')
+
+    def run_simulator(count: int, offset: int, run_seed: int) -> SimulationResultsType:
+        # Trials offset .. offset + count - 1
+        if simulator_cmd is None:
+            return run_backend(backend, count, n, p0, s, tr, beta, run_seed,
+                               max_cycles=max_cycles, trial_offset=offset, executor=executor)
+
+        status = os.system(
+            f'SIM_TRIAL_OFFSET={int(offset)} SIM_MAX_CYCLES={-1 if max_cycles is None else int(max_cycles)} {simulator_cmd} {count} {n} {p0} {s} {tr} {beta} {run_seed} > {json_path} 2> /dev/null')
+        data = load_simulation_json(json_path)
+        if data is None:
+            raise OSError(f"{simulator_cmd} failed with status {status}")
+        return data
+
+    try:
+        with cache.entry_lock(key):
+            file_path = None if force_recreation else cache.get(key)
+            cached = None if file_path is None else load_simulation(file_path)
+
+            try:
+                if cached is None:
+                    # Generate new dataset (or replace an unreadable one)
+                    if seed is None:
+                        seed = int(time.time() * 1000)
+
+                    def generate(target_path: str):
+                        save_simulation_binary(
+                            target_path, run_simulator(trial_count, 0, seed))
+
+                    file_path = cache.put(key, params, generate)
+                else:
+                    # Extend cached dataset with the missing trials
+                    missing = trial_count - cached['trial_count']
+                    if missing > 0:
+                        append_simulation_binary(file_path, run_simulator(
+                            missing, cached['trial_count'], cached['configs']['seed']))
+                        cache.refresh(key, params)
+            finally:
+                if os.path.isfile(json_path):
+                    os.remove(json_path)
+
+            # Memory-mapped while the entry can't be evicted, the mapping
+            # outlives a later eviction
+            simulation = load_simulation(file_path)
+    except OSError:
+        # Disk errors or a failed simulator executable
+        return None
+
+    if simulation is None:
+        return None
+    return slice_simulation(simulation, trial_count)
+
+
+def quantile_interval(values: List[int], quantile: float, confidence: float = 0.95) -> Tuple[float, float]:
+    """Distribution-free confidence interval for a quantile from order statistics
+
+    The number of samples below the true quantile is Binomial(m, quantile), so
+    the interval is bounded by the order statistics at the binomial
+    `(1 - confidence) / 2` and `(1 + confidence) / 2` quantiles. Sides that
+    the sample is too small to bound are infinite.
+    """
+
+    from scipy.stats import binom
+
+    values = np.sort(values)
+    m = len(values)
+    alpha = 1 - confidence
 
-    # Load and return simulation results
-    return load_simulation_json(file_path)
+    low_rank = int(binom.ppf(alpha / 2, m, quantile))
+    high_rank = int(binom.ppf(1 - alpha / 2, m, quantile)) + 1
 
+    low = float(values[low_rank - 1]) if low_rank >= 1 else -np.inf
+    high = float(values[high_rank - 1]) if high_rank <= m else np.inf
+    return low, high
 
-def sim_s_search(n: int, p: float, tr: int, beta: float, starting_s: int = 0, ending_s: int = 100, quantile: float = 0.01, target: int = 10000, trials: int = 1000, verbose: bool = False, max_cycles: Union[int, None] = None, **kwargs) -> Tuple[int, SimulationResultsType]:
-    simulations = {}
-    cur_simulation = None
 
-    s_low = starting_s
-    s_high = ending_s
+def _search_candidate(args: tuple) -> Union[dict, None]:
+    # Runs in a thread, trials are simulated by the shared executor's workers
+    trials, n, p, s, tr, beta, max_cycles, quantile, target, adaptive, kwargs = args
+    kwargs = dict(kwargs)
 
-    while s_low < s_high:
-        cur_s = (s_high + s_low) // 2
-        if verbose:
-            print(f"Trying s={cur_s}")
+    # Adaptive mode doubles the trial count until the interval excludes the target
+    count = min(adaptive['batch_trials'], trials) if adaptive else trials
+    while True:
+        simulation = load_or_generate_simulation(
+            count, n, p, s, tr, beta, max_cycles=max_cycles, **kwargs)
+        if simulation is None:
+            return None
 
-        cur_simulation = load_or_generate_simulation(
-            trials, n, p, cur_s, tr, beta, max_cycles=max_cycles or target * 2, **kwargs)
-        simulations[cur_s] = cur_simulation
-        quantile_val = np.quantile(cur_simulation['results'], quantile)
-        if verbose:
-            print(f"s={cur_s} {quantile}-quantile: {quantile_val}")
+        # Later batches extend the recreated dataset
+        kwargs.pop('force_recreation', None)
 
-        if quantile_val < target:
-            s_low = cur_s + 1
+        value = float(np.quantile(simulation['results'], quantile))
+        interval = quantile_interval(
+            simulation['results'], quantile, adaptive['confidence'] if adaptive else 0.95)
+
+        if interval[0] >= target:
+            reaches = True
+        elif interval[1] < target:
+            reaches = False
         else:
-            s_high = cur_s
+            reaches = value >= target
+            if adaptive and count < trials:
+                count = min(2 * count, trials)
+                continue
+
+        return {
+            'quantile': value,
+            'interval': interval,
+            'trials': simulation['trial_count'],
+            'reaches': reaches,
+        }
+
+
+def _search_candidates(s_low: int, s_high: int, k: int) -> List[int]:
+    """Points splitting [s_low, s_high) into k parts (a single midpoint for k = 2)"""
+    return sorted({s_low + (s_high - s_low) * i // k for i in range(1, k)})
+
+
+def sim_s_search(n: int, p: float, tr: int, beta: float, starting_s: int = 0, ending_s: int = 100, quantile: float = 0.01, target: int = 10000, trials: int = 1000, verbose: bool = False, max_cycles: Union[int, None] = None, candidates_per_round: int = 1, adaptive: bool = False, batch_trials: int = 250, confidence: float = 0.95, **kwargs) -> Tuple[int, SimulationResultsType]:
+    """Smallest s in [starting_s, ending_s] whose `quantile` of the simulated
+    time to critical reaches `target`.
+
+    With `candidates_per_round > 1` every round simulates that many candidates
+    at once, shrinking the bracket by a factor of `candidates_per_round + 1`
+    instead of 2. Trials of every candidate and round are simulated by a
+    single pool of worker processes living for the whole search.
+
+    With `adaptive=True` each candidate starts with `batch_trials` trials,
+    doubled until the `confidence` interval of the quantile (see
+    `quantile_interval`) lies entirely above or below `target`, `trials` being
+    the cap. The returned simulation holds a `search` entry mapping every
+    evaluated s to its quantile, interval and number of trials used.
+    """
+
+    max_cycles = max_cycles or target * 2
+    adaptive = {'batch_trials': int(batch_trials),
+                'confidence': float(confidence)} if adaptive else None
+    evaluated = {}
+
+    def evaluate(candidates: List[int]):
+        missing = [s for s in candidates if s not in evaluated]
+        tasks = [(trials, n, p, s, tr, beta, max_cycles, quantile, target, adaptive, kwargs)
+                 for s in missing]
 
-    return s_low, simulations[s_low]
+        if len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=len(tasks)) as threads:
+                values = list(threads.map(_search_candidate, tasks))
+        else:
+            values = [_search_candidate(task) for task in tasks]
+
+        for s, value in zip(missing, values):
+            if value is None:
+                raise RuntimeError(f"simulation failed for s={s}")
+            evaluated[s] = value
+            if verbose:
+                print(f"s={s} {quantile}-quantile: {value['quantile']} "
+                      f"interval: {value['interval']} trials: {value['trials']}")
+
+    with contextlib.ExitStack() as stack:
+        if kwargs.get('executor') is None and kwargs.get('simulator_cmd') is None \
+                and not kwargs.get('enable_rusty'):
+            # One pool of warm workers for every candidate of every round
+            kwargs['executor'] = stack.enter_context(trial_executor())
+
+        s_low = starting_s
+        s_high = ending_s
+
+        while s_low < s_high:
+            candidates = _search_candidates(
+                s_low, s_high, max(int(candidates_per_round), 1) + 1)
+            if verbose:
+                print(f"Trying s={', '.join(map(str, candidates))}")
+
+            evaluate(candidates)
+
+            # Keep the bracket around the first candidate reaching the target
+            for s in candidates:
+                if not evaluated[s]['reaches']:
+                    s_low = s + 1
+                else:
+                    s_high = s
+                    break
+
+        # Candidates are already cached, a forced recreation already happened
+        kwargs.pop('force_recreation', None)
+        simulation = load_or_generate_simulation(
+            evaluated[s_low]['trials'] if s_low in evaluated else trials,
+            n, p, s_low, tr, beta, max_cycles=max_cycles, **kwargs)
+
+        if simulation is not None:
+            simulation['search'] = evaluated
+        return s_low, simulation
 
 
 def build_pmf(
     data: SimulationResultsType,
     field: str = 'results'
 ) -> Tuple[List[int], List[float]]:
-    counts = defaultdict(lambda: 0)
-    tot = len(data[field])
-
-    for el in data[field]:
-        counts[el] += 1
-
-    xs = list(range(min(counts.keys()), max(counts.keys()) + 1))
-    ys = [counts[x] / tot for x in xs]
-
-    return xs, ys
+    hist = Histogram.from_values(data[field])
+    return hist.edges().tolist(), hist.probabilities().tolist()
 
 
 def normalized_results(simulation: SimulationResultsType, field: str = 'results') -> List[float]:
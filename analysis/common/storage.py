@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import shutil
+
+import numpy as np
+
+from typing import Union
+
+"""
+Binary simulation datasets, same layout written by `simulators/python/storage.py`:
+    meta.json      {'trial_count', 'configs', 'columns': {name: dtype}}
+    results.bin    raw little-endian int64 column
+    results_z.bin  raw little-endian int64 column
+    censored.bin   optional, one byte per trial, 1 when cut at max_cycles or by a time budget
+"""
+
+META_FILE = 'meta.json'
+COLUMNS = ('results', 'results_z')
+COLUMN_DTYPE = '<i8'
+CENSORED_DTYPE = '|b1'
+
+
+class SimulationResults(dict):
+    """Simulation results dict computing `results_delta` on first access
+
+    Datasets without a `censored` column (e.g. from the Rust simulators) flag
+    the trials that reached `configs['max_cycles']` instead.
+    """
+
+    def __missing__(self, key):
+        if key == 'results_delta':
+            value = np.subtract(self['results'], self['results_z'])
+        elif key == 'censored':
+            results = np.asarray(self['results'])
+            max_cycles = self['configs'].get('max_cycles') or 0
+            value = results >= max_cycles if max_cycles > 0 else np.zeros(
+                len(results), dtype=bool)
+        else:
+            raise KeyError(key)
+
+        self[key] = value
+        return value
+
+
+def is_simulation_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def read_simulation_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE), 'r') as f:
+        return json.load(f)
+
+
+def write_simulation_meta(path: str, meta: dict):
+    meta_path = os.path.join(path, META_FILE)
+    tmp_path = f'{meta_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def load_simulation_binary(path: str, mmap: bool = True) -> Union[SimulationResults, None]:
+    """Load simulation results from a binary dataset directory
+
+    Args:
+        path (str): Target dataset directory
+        mmap (bool, optional): memory-map the columns instead of reading them. Defaults to True.
+
+    Returns:
+        Any[SimulationResults, None]: simulation data, may return None on failure
+    """
+
+    if not is_simulation_dir(path):
+        return None
+
+    try:
+        meta = read_simulation_meta(path)
+
+        # Columns may be longer than `trial_count` while being appended to
+        trial_count = int(meta['trial_count'])
+        data = SimulationResults(
+            trial_count=trial_count, configs=meta['configs'])
+
+        for name, dtype in meta['columns'].items():
+            column_path = os.path.join(path, f'{name}.bin')
+            if trial_count == 0:
+                data[name] = np.empty(0, dtype=dtype)
+            elif mmap:
+                data[name] = np.memmap(
+                    column_path, dtype=dtype, mode='r', shape=(trial_count,))
+            else:
+                data[name] = np.fromfile(
+                    column_path, dtype=dtype, count=trial_count)
+
+        return data
+    except Exception:
+        return None
+
+
+def save_simulation_binary(path: str, data: dict):
+    """Write simulation results as a binary dataset directory
+
+    The dataset is built next to `path` and renamed into place, so readers
+    never see a partially written dataset.
+
+    Args:
+        path (str): Target dataset directory, must not exist
+        data (dict): simulation data with `configs` and the result columns
+    """
+
+    tmp_path = f'{path.rstrip(os.sep)}.{os.getpid()}.tmp'
+    os.makedirs(tmp_path)
+
+    try:
+        columns = {name: COLUMN_DTYPE for name in COLUMNS}
+        if 'censored' in data:
+            columns['censored'] = CENSORED_DTYPE
+
+        for name, dtype in columns.items():
+            column = np.asarray(data[name], dtype=dtype)
+            column.tofile(os.path.join(tmp_path, f'{name}.bin'))
+
+        meta = {
+            'trial_count': len(data[COLUMNS[0]]),
+            'configs': data['configs'],
+            'columns': columns,
+        }
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def append_simulation_binary(path: str, data: dict) -> int:
+    """Append result columns to a binary dataset directory
+
+    Rows are written past the current `trial_count` first and only then
+    committed by replacing `meta.json`, so readers never see partial rows.
+
+    Args:
+        path (str): Target dataset directory
+        data (dict): simulation data with the dataset's result columns
+
+    Returns:
+        int: new trial count
+    """
+
+    meta = read_simulation_meta(path)
+    trial_count = int(meta['trial_count'])
+    appended = len(data[COLUMNS[0]])
+
+    for name, dtype in meta['columns'].items():
+        if name in data:
+            column = np.asarray(data[name], dtype=dtype)
+        else:
+            column = np.zeros(appended, dtype=dtype)
+        if len(column) != appended:
+            raise ValueError("all columns must have the same length")
+
+        with open(os.path.join(path, f'{name}.bin'), 'r+b') as f:
+            # Drop rows left behind by an interrupted append
+            f.truncate(trial_count * column.itemsize)
+            f.seek(0, os.SEEK_END)
+            column.tofile(f)
+
+    meta['trial_count'] = trial_count + appended
+    write_simulation_meta(path, meta)
+    return meta['trial_count']
+
+
+def slice_simulation(data: SimulationResults, trial_count: int) -> SimulationResults:
+    """First `trial_count` trials of a simulation (views, no copies)"""
+
+    if trial_count >= data['trial_count']:
+        return data
+
+    sliced = SimulationResults(trial_count=trial_count, configs=data['configs'])
+    for name in (*COLUMNS, 'censored'):
+        if name in data:
+            sliced[name] = data[name][:trial_count]
+
+    return sliced
+
+
+def load_grid(path: str, mmap: bool = True) -> dict:
+    """Load every dataset of a grid results store (see `simulators/python/grid.py`)
+
+    Returns:
+        dict: `{(n, p0, s0, tr, beta): SimulationResults}`, skipping unreadable datasets
+    """
+
+    with open(os.path.join(path, 'grid.json'), 'r') as f:
+        grid = json.load(f)
+
+    datasets = {}
+    for name, config in grid['datasets'].items():
+        data = load_simulation_binary(os.path.join(path, name), mmap)
+        if data is not None:
+            key = tuple(config[k] for k in ('n', 'p0', 's0', 'tr', 'beta'))
+            datasets[key] = data
+
+    return datasets
+
+
+def convert_json_simulation(json_path: str, out_path: Union[str, None] = None) -> str:
+    """Convert a JSON simulation dataset into a binary dataset directory
+
+    Args:
+        json_path (str): JSON dataset path
+        out_path (Any[str, None], optional): target directory. Defaults to the JSON path without its extension.
+
+    Returns:
+        str: path of the binary dataset
+    """
+
+    if out_path is None:
+        out_path = os.path.splitext(json_path)[0]
+
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    save_simulation_binary(out_path, data)
+    return out_path
+
+
+def convert_json_datasets(datasets_path: str, remove_json: bool = False):
+    """Convert every JSON dataset under `datasets_path` that has no binary copy yet
+
+    Other JSON files (e.g. cache indexes or grid specs) and the binary datasets
+    themselves are left alone.
+    """
+
+    for root, dirs, files in os.walk(datasets_path):
+        dirs[:] = [d for d in dirs if not is_simulation_dir(os.path.join(root, d))]
+
+        for file_name in sorted(files):
+            if not file_name.endswith('.json') or file_name == META_FILE:
+                continue
+
+            json_path = os.path.join(root, file_name)
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or 'results' not in data:
+                continue
+
+            out_path = os.path.splitext(json_path)[0]
+            if not is_simulation_dir(out_path):
+                save_simulation_binary(out_path, data)
+
+            if remove_json:
+                os.remove(json_path)
+
+
+if __name__ == '__main__':
+    # Usage: python -m common.storage {datasets_dir | dataset.json}...
+    for target in sys.argv[1:]:
+        if os.path.isdir(target):
+            convert_json_datasets(target)
+        else:
+            print(convert_json_simulation(target))
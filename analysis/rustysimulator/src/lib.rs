@@ -159,7 +159,7 @@ struct Results {
     results_z: Vec<i64>,
 }
 
-fn simulate_raw(trial_count: i64, configs: SimulationConfigs) -> String {
+fn simulate_raw(trial_count: i64, trial_offset: u64, configs: SimulationConfigs) -> String {
     // RNG Seeder
     let seed: u64 = if configs.seed == 0 {
         SystemTime::now()
@@ -173,6 +173,9 @@ fn simulate_raw(trial_count: i64, configs: SimulationConfigs) -> String {
     // Seed RNG
     let mut seed_generator = rand_pcg::Pcg64::seed_from_u64(seed);
 
+    // Skip the seeds of earlier trials so runs can be extended
+    seed_generator.advance(trial_offset as u128);
+
     // Result Struct
     let mut results = Results {
         trial_count,
@@ -208,7 +211,7 @@ fn simulate_raw(trial_count: i64, configs: SimulationConfigs) -> String {
     return serde_json::to_string(&results).unwrap();
 }
 
-#[pyfunction]
+#[pyfunction(trial_offset = "0")]
 fn simulate(
     trial_count: i64,
     n: i64,
@@ -218,9 +221,11 @@ fn simulate(
     beta: f64,
     seed: u64,
     max_cycles: i64,
+    trial_offset: u64,
 ) -> PyResult<String> {
     Ok(simulate_raw(
         trial_count,
+        trial_offset,
         SimulationConfigs {
             n,
             p0,
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+
+"""
+Benchmarks of the simulator and analysis hot paths, with fixed seeds.
+
+    python benchmarks/run.py                   run, print and save to latest.json
+    python benchmarks/run.py --save-baseline   also save as the baseline
+    python benchmarks/run.py -k trial          only benchmarks containing 'trial'
+
+Every run is compared with `baseline.json` when it exists: benchmarks slower
+(or using more memory) than the baseline by more than `--threshold` are
+flagged and the exit status is 1. Timings are the median of `--repeat` runs,
+peak memory is traced (tracemalloc) on an extra warm-up run and only covers
+the benchmarking process, not pool workers.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'analysis'))
+
+import numpy as np  # noqa: E402
+
+from simulators.python import simulator  # noqa: E402
+from common import models  # noqa: E402
+from common.simulation import build_pmf, load_simulation_json  # noqa: E402
+
+from typing import Callable, Dict, List, NamedTuple, Tuple  # noqa: E402
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, 'latest.json')
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+
+SEED = 1984
+
+# (n, p0, s0, tr, beta) from the notebook, trials are cut at MAX_CYCLES ticks
+# since they are far too long to run to the end
+CONFIGS = {
+    'tr20': (100, 0.01, 40, 20, 0.0),
+    'aging': (100, 0.001, 55, 12, 0.001),
+}
+MAX_CYCLES = 2000
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # Builds the timed callable, which returns `(trials, ticks)` it simulated,
+    # or a context manager yielding it when it owns resources to release
+    setup: Callable[[], Callable[[], Tuple[int, int]]]
+
+
+def bench_next_state(config: tuple, ticks: int = 5000):
+    def run():
+        sim = simulator.FactorySimulator(*config, seed=SEED)
+        for _ in range(ticks):
+            if sim.next_state()['critical']:
+                sim = simulator.FactorySimulator(*config, seed=SEED)
+        return 0, ticks
+
+    return run
+
+
+def bench_factory_trial(config: tuple, trial_count: int = 5):
+    # Seeded with the trial streams, as `multiple_trials` does
+    streams = simulator.TrialStreams(SEED)
+
+    def run():
+        results = [simulator.factory_trial(*config, seed=streams.stream(i),
+                                           max_cycles=MAX_CYCLES)[0] for i in range(trial_count)]
+        return trial_count, sum(results)
+
+    return run
+
+
+def bench_multiple_trials(config: tuple, trial_count: int, parallel: bool):
+    def run():
+        data = simulator.multiple_trials(trial_count, *config, SEED, parallel=parallel,
+                                         parallel_threshold=1, backend='python',
+                                         max_cycles=MAX_CYCLES)
+        return data['trial_count'], sum(data['results'])
+
+    return run
+
+
+def _synthetic_results(trial_count: int) -> np.ndarray:
+    # tnbinom(100, 40, 0.01)-like times to critical
+    rng = np.random.default_rng(SEED)
+    return (rng.negative_binomial(41, 0.01, trial_count) + 41) // 100 + 1
+
+
+def bench_build_pmf(trial_count: int = 1000000):
+    data = {'results': _synthetic_results(trial_count)}
+
+    def run():
+        build_pmf(data)
+        return trial_count, 0
+
+    return run
+
+
+def bench_tnbinom(method: str, size: int = 100000):
+    k = np.arange(size)
+
+    def run():
+        # Cold tables, as the first call for a new config
+        models.probability_table.cache_clear()
+        getattr(models.tnbinom, method)(k, 100, 40, 0.01)
+        return 0, 0
+
+    return run
+
+
+@contextlib.contextmanager
+def bench_load_simulation_json(trial_count: int = 200000):
+    results = _synthetic_results(trial_count)
+    data = {
+        'trial_count': trial_count,
+        'configs': simulator.trial_configs(100, 0.01, 40, 20, 0.0, SEED, 'python'),
+        'results': results.tolist(),
+        'results_z': (results // 2).tolist(),
+        'censored': [False] * trial_count,
+    }
+
+    with tempfile.TemporaryDirectory(prefix='benchmarks-') as directory:
+        path = os.path.join(directory, 'simulation.json')
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+        def run():
+            load_simulation_json(path)
+            return trial_count, 0
+
+        yield run
+
+
+def benchmarks() -> List[Benchmark]:
+    suite = []
+    for label, config in CONFIGS.items():
+        suite += [
+            Benchmark(f'next_state[{label}]',
+                      lambda c=config: bench_next_state(c)),
+            Benchmark(f'factory_trial[{label}]',
+                      lambda c=config: bench_factory_trial(c)),
+            Benchmark(f'multiple_trials_serial[{label}]',
+                      lambda c=config: bench_multiple_trials(c, 8, False)),
+            Benchmark(f'multiple_trials_pool[{label}]',
+                      lambda c=config: bench_multiple_trials(c, 32, True)),
+        ]
+
+    suite += [
+        Benchmark('build_pmf', bench_build_pmf),
+        Benchmark('tnbinom.pmf', lambda: bench_tnbinom('pmf')),
+        Benchmark('tnbinom.cdf', lambda: bench_tnbinom('cdf')),
+        Benchmark('load_simulation_json', bench_load_simulation_json),
+    ]
+    return suite
+
+
+def measure(benchmark: Benchmark, repeat: int) -> dict:
+    with contextlib.ExitStack() as stack:
+        run = benchmark.setup()
+        if isinstance(run, contextlib.AbstractContextManager):
+            run = stack.enter_context(run)
+
+        # Warm-up run, traced for the peak memory
+        tracemalloc.start()
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            trials, ticks = run()
+            timings.append(time.perf_counter() - begin)
+
+    seconds = statistics.median(timings)
+    return {
+        'seconds': seconds,
+        'timings': timings,
+        'trials': trials,
+        'ticks': ticks,
+        'trials_per_second': trials / seconds,
+        'ticks_per_second': ticks / seconds,
+        'peak_memory': peak_memory,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> Dict[str, dict]:
+    """Ratio to the baseline of the time and peak memory of every common benchmark"""
+    report = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        expected = baseline[name]
+        time_ratio = result['seconds'] / max(expected['seconds'], 1e-12)
+        memory_ratio = result['peak_memory'] / max(expected['peak_memory'], 1)
+        report[name] = {
+            'time_ratio': time_ratio,
+            'memory_ratio': memory_ratio,
+            'regression': time_ratio > 1 + threshold or memory_ratio > 1 + threshold,
+        }
+    return report
+
+
+def format_memory(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', '--filter', default='',
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for benchmark in benchmarks():
+        if args.filter not in benchmark.name:
+            continue
+
+        result = measure(benchmark, args.repeat)
+        results[benchmark.name] = result
+        print(f"{benchmark.name:36} {result['seconds']:9.4f} s "
+              f"{result['trials_per_second']:12.1f} trials/s "
+              f"{result['ticks_per_second']:12.1f} ticks/s "
+              f"{format_memory(result['peak_memory']):>12}", flush=True)
+
+    output = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processes': os.cpu_count(),
+            'seed': SEED,
+            'max_cycles': MAX_CYCLES,
+        },
+        'benchmarks': results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+
+    status = 0
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['benchmarks']
+
+        report = compare(results, baseline, args.threshold)
+        print()
+        for name, entry in report.items():
+            flag = 'REGRESSION' if entry['regression'] else ''
+            print(f"{name:36} time x{entry['time_ratio']:.2f} "
+                  f"memory x{entry['memory_ratio']:.2f} {flag}")
+            if entry['regression']:
+                status = 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    return status
+
+
+if __name__ == '__main__':
+    exit(main(sys.argv[1:]))
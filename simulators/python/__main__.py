@@ -1,3 +1,16 @@
+import os
+import sys
+import time
+
+if __package__:
+    from .simulator import INF, stream_trials, trial_configs
+    from .storage import write_trials
+else:
+    # Run as a script or from `simulators/python` on sys.path
+    from simulator import INF, stream_trials, trial_configs
+    from storage import write_trials
+
+
 if __name__ == '__main__':
     if len(sys.argv) < 6:
         print("Args: {trial_count} {n} {p0} {s0} {tr} [beta] [seed]")
@@ -15,7 +28,13 @@ if __name__ == '__main__':
     beta = 0 if len(sys.argv) < 7 else float(sys.argv[6])
     seed = int(time.time() * 1000) if len(sys.argv) < 8 else int(sys.argv[7])
 
-    data = multiple_trials(trial_count, n, p0, s0, tr, beta, seed)
+    backend = os.environ.get('SIM_BACKEND', 'auto')
+
+    # Same convention as the Rust simulator, non-positive means no limit
+    max_cycles = int(os.environ.get('SIM_MAX_CYCLES', -1))
+    max_cycles = max_cycles if max_cycles > 0 else None
+    time_budget = os.environ.get('SIM_TIME_BUDGET')
+    time_budget = None if time_budget is None else float(time_budget)
 
     def escape(x): return str(x).replace('.', '_')
 
@@ -24,7 +43,11 @@ if __name__ == '__main__':
     except Exception as _:
         pass
 
-    file_name = f'results/{trial_count}-{n}-{escape(p0)}-{s0}-{tr}-{escape(beta)}-{seed}.json'
+    # Trials are streamed into a binary trials directory (see storage.py),
+    # replacing the one of a previous run with the same arguments
+    dir_name = f'results/{trial_count}-{n}-{escape(p0)}-{s0}-{tr}-{escape(beta)}-{seed}'
 
-    with open(file_name, 'w') as f:
-        json.dump(data, f)
+    write_trials(dir_name, trial_configs(n, p0, s0, tr, beta, seed, backend, max_cycles),
+                 stream_trials(trial_count, n, p0, s0, tr, beta, seed, backend=backend,
+                               max_cycles=max_cycles, time_budget=time_budget),
+                 replace=True)
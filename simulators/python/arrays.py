@@ -0,0 +1,154 @@
+import time
+
+import numpy as np
+
+from typing import Tuple, Union
+
+
+INF = int(2 ** 63 - 1)
+
+# Ticks between wall-clock budget checks
+DEADLINE_CHECK_TICKS = 1024
+
+
+class ArrayFactorySimulator:
+    """Single trial `FactorySimulator` with struct-of-arrays machine state.
+
+    Machine `i` is described by `run_begin[i]` (tick it was put to work, 0 when
+    idle or broken) and `repair_end[i]` (tick its repair finishes, 0 when not
+    being repaired), as the `[id, run_begin, repair_end]` lists of
+    `FactorySimulator`. Idle machines are kept, in the order they became idle,
+    in a ring buffer of machine indices.
+
+    Repairs, hazards and failure draws of a tick are array operations over the
+    whole fleet, so the Python work per tick does not grow with `n`.
+    """
+
+    n: int  # Number of machines required for the system to work
+    p0: float  # Initial probability of failure
+    s0: int  # Backup Machines
+    beta: float  # Failure increase rate
+    tr: int  # Machine recovery time
+    max_cycles: Union[int, None]  # Ticks after which a trial is censored
+
+    _rng: np.random.Generator
+    _clock: int
+
+    _run_begin: np.ndarray  # (n + s0,)
+    _repair_end: np.ndarray  # (n + s0,)
+    _running: int
+
+    _idle_ring: np.ndarray  # (n + s0,) machine indices
+    _idle_head: int  # Ring position of the oldest idle machine
+    _idle_count: int
+
+    def __init__(self, n: int, p0: float, s0: int, tr: int, beta: float,
+                 seed: int = int(1984), max_cycles: Union[int, None] = None, *args, **kwargs):
+        if n is None:
+            raise ValueError("n must not be None")
+        if p0 is None:
+            raise ValueError("p0 must not be None")
+        if s0 is None:
+            raise ValueError("s0 must not be None")
+        if beta is None:
+            raise ValueError("beta must not be None")
+        if tr is None:
+            raise ValueError("tr must not be None")
+
+        self.n = int(n)
+        self.p0 = float(p0)
+        self.s0 = int(s0)
+        self.beta = float(beta)
+        self.tr = int(tr)
+        self.max_cycles = None if max_cycles is None else int(max_cycles)
+
+        self._clock = int(0)
+        self._rng = np.random.default_rng(seed)
+
+        width = self.n + self.s0
+        self._run_begin = np.zeros(width, dtype=np.int64)
+        self._run_begin[:self.n] = 1
+        self._repair_end = np.zeros(width, dtype=np.int64)
+        self._running = int(self.n)
+
+        self._idle_ring = np.zeros(max(width, 1), dtype=np.int64)
+        self._idle_ring[:self.s0] = np.arange(self.n, width)
+        self._idle_head = 0
+        self._idle_count = self.s0
+
+    @property
+    def idle(self) -> int:
+        return self._idle_count
+
+    def _push_idle(self, machines: np.ndarray):
+        size = len(self._idle_ring)
+        tail = (self._idle_head + self._idle_count) % size
+        self._idle_ring[(tail + np.arange(len(machines))) % size] = machines
+        self._idle_count += len(machines)
+
+    def _pop_idle(self, count: int) -> np.ndarray:
+        size = len(self._idle_ring)
+        machines = self._idle_ring[(self._idle_head + np.arange(count)) % size]
+        self._idle_head = (self._idle_head + count) % size
+        self._idle_count -= count
+        return machines
+
+    def next_state(self):
+        self._clock += 1
+        clock = self._clock
+
+        # Finished repairs become idle, in machine order as in `next_state`
+        repaired = np.flatnonzero(
+            (self._repair_end != 0) & (self._repair_end <= clock))
+        if len(repaired) > 0:
+            self._repair_end[repaired] = 0
+            self._push_idle(repaired)
+
+        # One draw per running machine
+        running = np.flatnonzero(self._run_begin)
+        draws = self._rng.random(len(running))
+        if self.beta == 0:
+            broken = running[draws <= self.p0]
+        else:
+            p = self.p0 + self.beta * (clock - self._run_begin[running])
+            broken = running[draws <= p]
+
+        n_broken = self.n - self._running + len(broken)
+        if len(broken) > 0:
+            self._run_begin[broken] = 0
+            self._repair_end[broken] = clock + self.tr if self.tr < INF - clock else INF
+
+        recovered = min(n_broken, self._idle_count)
+        if recovered > 0:
+            self._run_begin[self._pop_idle(recovered)] = clock
+            n_broken -= recovered
+
+        self._running = self.n - n_broken
+
+        critical = self._running < self.n
+        return {
+            'clock': clock,
+            'critical': critical,
+            'censored': not critical and self.max_cycles is not None and clock >= self.max_cycles
+        }
+
+
+def array_trial(*args, max_cycles: Union[int, None] = None, deadline: Union[float, None] = None,
+                **kwargs) -> Tuple[int, int, bool]:
+    """Same trial as `factory_trial`, on an `ArrayFactorySimulator`"""
+    simulator = ArrayFactorySimulator(*args, max_cycles=max_cycles, **kwargs)
+
+    z = 0
+    while True:
+        st = simulator.next_state()
+
+        availability = 0 if simulator.s0 == 0 else simulator.idle / simulator.s0
+        if z == 0 and availability < 0.2:
+            z = simulator._clock
+
+        if st['critical']:
+            return (simulator._clock, z or simulator._clock, False)
+
+        if st['censored'] or (deadline is not None and simulator._clock % DEADLINE_CHECK_TICKS == 0
+                              and time.time() > deadline):
+            return (simulator._clock, z or simulator._clock, True)
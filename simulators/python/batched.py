@@ -0,0 +1,172 @@
+import time
+
+import numpy as np
+
+from typing import List, Tuple, Union
+
+
+INF = int(2 ** 63 - 1)
+
+# Ticks between wall-clock budget checks
+DEADLINE_CHECK_TICKS = 64
+
+
+class BatchedFactorySimulator:
+    """Advances K independent factory trials in lockstep.
+
+    Every trial owns a row of the `(K, n + s0)` state arrays, with the same
+    meaning as `FactorySimulator._machines`: `run_begin` is the tick a machine
+    was put to work (0 when idle or broken) and `repair_end` the tick its repair
+    finishes (0 when not being repaired). Idle machines are interchangeable, so
+    each trial only keeps how many of them there are.
+    """
+
+    n: int  # Number of machines required for the system to work
+    p0: float  # Initial probability of failure
+    s0: int  # Backup Machines
+    beta: float  # Failure increase rate
+    tr: int  # Machine recovery time
+    max_cycles: Union[int, None]  # Ticks after which trials are censored
+
+    _rng: np.random.Generator
+    _clock: int
+
+    _trials: np.ndarray  # (K,) trial index of each active row
+    _run_begin: np.ndarray  # (K, n + s0)
+    _repair_end: np.ndarray  # (K, n + s0)
+    _idle: np.ndarray  # (K,)
+    _z: np.ndarray  # (K,)
+
+    _results: np.ndarray
+    _results_z: np.ndarray
+    _censored: np.ndarray
+
+    def __init__(self, trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float,
+                 seed: int = int(1984), max_cycles: Union[int, None] = None):
+        if n is None:
+            raise ValueError("n must not be None")
+        if p0 is None:
+            raise ValueError("p0 must not be None")
+        if s0 is None:
+            raise ValueError("s0 must not be None")
+        if beta is None:
+            raise ValueError("beta must not be None")
+        if tr is None:
+            raise ValueError("tr must not be None")
+
+        self.n = int(n)
+        self.p0 = float(p0)
+        self.s0 = int(s0)
+        self.beta = float(beta)
+        self.tr = int(tr)
+        self.max_cycles = None if max_cycles is None else int(max_cycles)
+
+        self._clock = int(0)
+        self._rng = np.random.default_rng(seed)
+
+        trial_count = int(trial_count)
+        width = self.n + self.s0
+
+        self._trials = np.arange(trial_count)
+        self._run_begin = np.zeros((trial_count, width), dtype=np.int64)
+        self._run_begin[:, :self.n] = 1
+        self._repair_end = np.zeros((trial_count, width), dtype=np.int64)
+        self._idle = np.full(trial_count, self.s0, dtype=np.int64)
+        self._z = np.zeros(trial_count, dtype=np.int64)
+
+        self._results = np.zeros(trial_count, dtype=np.int64)
+        self._results_z = np.zeros(trial_count, dtype=np.int64)
+        self._censored = np.zeros(trial_count, dtype=bool)
+
+    @property
+    def active(self) -> int:
+        return len(self._trials)
+
+    def next_state(self):
+        self._clock += 1
+        clock = self._clock
+
+        # Finished repairs go back to the idle pool
+        repaired = (self._repair_end != 0) & (self._repair_end <= clock)
+        self._repair_end[repaired] = 0
+        self._idle += repaired.sum(axis=1)
+
+        # One draw per machine slot for the whole batch
+        running = self._run_begin != 0
+        draws = self._rng.random(self._run_begin.shape)
+        if self.beta == 0:
+            broken = running & (draws <= self.p0)
+        else:
+            p = self.p0 + self.beta * (clock - self._run_begin)
+            broken = running & (draws <= p)
+
+        repair_end = clock + self.tr if self.tr < INF - clock else INF
+        self._run_begin[broken] = 0
+        self._repair_end[broken] = repair_end
+        n_broken = broken.sum(axis=1)
+
+        # Replace broken machines with the first idle slots of each row
+        recovered = np.minimum(n_broken, self._idle)
+        if recovered.any():
+            idle_slots = (self._run_begin == 0) & (self._repair_end == 0)
+            targets = idle_slots & (
+                np.cumsum(idle_slots, axis=1) <= recovered[:, None])
+            self._run_begin[targets] = clock
+            self._idle -= recovered
+
+        # Same availability rule as `factory_trial`
+        if self.s0 == 0:
+            low = np.ones(self.active, dtype=bool)
+        else:
+            low = self._idle / self.s0 < 0.2
+        self._z[(self._z == 0) & low] = clock
+
+        critical = n_broken > recovered
+        if critical.any():
+            self._finish(critical)
+
+        if self.max_cycles is not None and clock >= self.max_cycles and self.active > 0:
+            self.censor()
+
+        return {
+            'clock': clock,
+            'active': self.active
+        }
+
+    def censor(self):
+        """Stop every active trial at the current tick, flagging it as censored"""
+        self._finish(np.ones(self.active, dtype=bool), censored=True)
+
+    def _finish(self, critical: np.ndarray, censored: bool = False):
+        done = self._trials[critical]
+        z = self._z[critical]
+        self._results[done] = self._clock
+        self._results_z[done] = np.where(z == 0, self._clock, z)
+        self._censored[done] = censored
+
+        alive = ~critical
+        self._trials = self._trials[alive]
+        self._run_begin = self._run_begin[alive]
+        self._repair_end = self._repair_end[alive]
+        self._idle = self._idle[alive]
+        self._z = self._z[alive]
+
+    def run(self, deadline: Union[float, None] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Runs every trial to the end, censoring the ones still running at the
+        `deadline` (`time.time()` seconds)"""
+        while self.active > 0:
+            self.next_state()
+
+            if deadline is not None and self._clock % DEADLINE_CHECK_TICKS == 0 and time.time() > deadline:
+                self.censor()
+
+        return self._results, self._results_z, self._censored
+
+
+def batched_trials(n: int, p0: float, s0: int, tr: int, beta: float, trial_count: int,
+                   seed: int, max_cycles: Union[int, None] = None,
+                   deadline: Union[float, None] = None) -> List[Tuple[int, int, bool]]:
+    simulator = BatchedFactorySimulator(
+        trial_count, n, p0, s0, tr, beta, seed, max_cycles)
+    results, results_z, censored = simulator.run(deadline)
+    return list(zip(results.tolist(), results_z.tolist(), censored.tolist()))
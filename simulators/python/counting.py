@@ -0,0 +1,166 @@
+import collections
+import time
+
+import numpy as np
+
+from typing import Tuple, Union
+
+
+INF = int(2 ** 63 - 1)
+
+# Failure ticks between wall-clock budget checks
+DEADLINE_CHECK_EVENTS = 1024
+
+
+class FailureBlocks:
+    """Ticks with failures of `n` exchangeable machines breaking with
+    probability `p0`, for the `beta == 0` case.
+
+    The failures of each tick are a single `Binomial(n, p0)` draw, these are
+    drawn a block of ticks at a time and ticks without failures are skipped
+    altogether. Subclasses call `_reset_blocks` once `n`, `p0` and `_rng` are
+    set.
+    """
+
+    # Blocks start small for short trials and double up to MAX_BLOCK
+    MIN_BLOCK = 64
+    MAX_BLOCK = 65536
+
+    n: int
+    p0: float
+
+    _rng: np.random.Generator
+
+    _block_size: int
+    _block_end: int  # Last tick covered by the drawn block
+    _failure_ticks: list
+    _failure_counts: list
+    _next: int
+
+    def _reset_blocks(self):
+        self._block_size = self.MIN_BLOCK
+        self._block_end = 0
+        self._failure_ticks = []
+        self._failure_counts = []
+        self._next = 0
+
+    def _draw_block(self):
+        size = self._block_size
+        counts = self._rng.binomial(self.n, min(self.p0, 1.0), size=size)
+        ticks = np.flatnonzero(counts)
+
+        self._failure_ticks = (ticks + self._block_end + 1).tolist()
+        self._failure_counts = counts[ticks].tolist()
+        self._next = 0
+        self._block_end += size
+        self._block_size = min(2 * size, self.MAX_BLOCK)
+
+    def _next_failure_tick(self) -> Tuple[int, int]:
+        """`(tick, failures)` of the next tick with at least one failure"""
+        while self._next == len(self._failure_ticks):
+            self._draw_block()
+
+        clock = self._failure_ticks[self._next]
+        n_broken = self._failure_counts[self._next]
+        self._next += 1
+        return clock, n_broken
+
+
+class CountingFactorySimulator(FailureBlocks):
+    """Counting-state simulator for the `beta == 0` case.
+
+    Without aging every running machine breaks with the same probability `p0`,
+    so machines are exchangeable and the state reduces to the idle count plus a
+    FIFO of `[repair_end, count]` entries (`tr` is constant, so repairs finish
+    in the order they started). While the system is not critical all `n`
+    machines are running, so the failures of each tick are a single
+    `Binomial(n, p0)` draw (see `FailureBlocks`).
+    """
+
+    n: int  # Number of machines required for the system to work
+    p0: float  # Initial probability of failure
+    s0: int  # Backup Machines
+    beta: float  # Failure increase rate
+    tr: int  # Machine recovery time
+
+    _rng: np.random.Generator
+    _clock: int
+
+    _idle: int
+    _repairs: collections.deque  # [repair_end, count]
+
+    def __init__(self, n: int, p0: float, s0: int, tr: int, beta: float = 0.0,
+                 seed: int = int(1984), *args, **kwargs):
+        if n is None:
+            raise ValueError("n must not be None")
+        if p0 is None:
+            raise ValueError("p0 must not be None")
+        if s0 is None:
+            raise ValueError("s0 must not be None")
+        if tr is None:
+            raise ValueError("tr must not be None")
+        if beta:
+            raise ValueError("counting simulator requires beta == 0")
+        if p0 <= 0:
+            raise ValueError("machines never fail with p0 = 0 and beta = 0")
+
+        self.n = int(n)
+        self.p0 = float(p0)
+        self.s0 = int(s0)
+        self.beta = 0.0
+        self.tr = int(tr)
+
+        self._clock = int(0)
+        self._rng = np.random.default_rng(seed)
+
+        self._idle = self.s0
+        self._repairs = collections.deque()
+
+        self._reset_blocks()
+
+    def next_failure(self):
+        """Jump to the next tick with at least one failure and handle it"""
+        clock, n_broken = self._next_failure_tick()
+        self._clock = clock
+
+        repairs = self._repairs
+        while repairs and repairs[0][0] <= clock:
+            self._idle += repairs.popleft()[1]
+
+        # Repairs are checked from the next tick on, as in `next_state`
+        repair_time = max(self.tr, 1)
+        if repair_time < INF - clock:
+            repairs.append([clock + repair_time, n_broken])
+
+        recovered = min(n_broken, self._idle)
+        self._idle -= recovered
+
+        return {
+            'clock': clock,
+            'critical': n_broken > recovered
+        }
+
+
+def counting_trial(*args, max_cycles: Union[int, None] = None, deadline: Union[float, None] = None,
+                   **kwargs) -> Tuple[int, int, bool]:
+    simulator = CountingFactorySimulator(*args, **kwargs)
+
+    # Without spares the availability is already low at the first tick
+    z = 1 if simulator.s0 == 0 else 0
+    failures = 0
+    while True:
+        st = simulator.next_failure()
+
+        if max_cycles is not None and simulator._clock > max_cycles:
+            # Survived up to max_cycles, the failure itself is past the horizon
+            return (max_cycles, z or max_cycles, True)
+
+        if z == 0 and simulator._idle / simulator.s0 < 0.2:
+            z = simulator._clock
+
+        if st['critical']:
+            return (simulator._clock, z, False)
+
+        failures += 1
+        if deadline is not None and failures % DEADLINE_CHECK_EVENTS == 0 and time.time() > deadline:
+            return (simulator._clock, z or simulator._clock, True)
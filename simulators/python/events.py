@@ -0,0 +1,245 @@
+import functools
+import heapq
+import math
+import time
+
+import numpy as np
+
+from typing import Tuple, Union
+
+
+INF = int(2 ** 63 - 1)
+
+# Events between wall-clock budget checks
+DEADLINE_CHECK_EVENTS = 1024
+
+# Heap entry kinds, repairs sort first so they are done before replacements
+REPAIR = 0
+FAILURE = 1
+
+
+class SurvivalTable:
+    """Cumulative log-survival by age of machines breaking with probability
+    `p0 + beta * age`, grown on demand
+
+    `values[a]` is minus the log of the probability of surviving ages `0..a`,
+    the table ends with `inf` once the hazard reaches 1.
+    """
+
+    CHUNK = 4096
+
+    p0: float
+    beta: float
+    values: np.ndarray
+
+    def __init__(self, p0: float, beta: float):
+        self.p0 = p0
+        self.beta = beta
+
+        self.values = np.empty(0)
+
+    @property
+    def certain(self) -> bool:
+        """Table already reached an age with hazard >= 1"""
+        return len(self.values) > 0 and self.values[-1] == math.inf
+
+    def extend(self) -> np.ndarray:
+        table = self.values
+        total = table[-1] if len(table) > 0 else 0.0
+
+        h = self.p0 + self.beta * np.arange(len(table), len(table) + self.CHUNK)
+        certain = h >= 1
+        parts = [table]
+        if certain.any():
+            h = h[:np.argmax(certain)]
+        parts.append(total - np.cumsum(np.log1p(-h)))
+        if certain.any():
+            parts.append([math.inf])
+
+        self.values = np.concatenate(parts)
+        return self.values
+
+
+@functools.lru_cache(maxsize=64)
+def survival_table(p0: float, beta: float) -> SurvivalTable:
+    """Shared table of `(p0, beta)`, least recently used ones are dropped"""
+    return SurvivalTable(p0, beta)
+
+
+class FailureTimeSampler:
+    """Samples the tick a running machine breaks at.
+
+    A machine with `run_begin = r` breaks at tick `t` with probability
+    `p0 + beta * (t - r)`, so its age at failure is drawn directly: a geometric
+    draw when `beta == 0` and, otherwise, inverse-CDF sampling over its
+    `SurvivalTable`. Both invert standard exponentials (`-log(u)`) drawn from
+    `rng`, and ages of the same start age are sampled a block at a time,
+    blocks doubling from MIN_BLOCK up to MAX_BLOCK.
+    """
+
+    MIN_BLOCK = 64
+    MAX_BLOCK = 65536
+
+    p0: float
+    beta: float
+
+    _rng: np.random.Generator
+    _block_size: int
+    _blocks: dict  # start age -> next age of its current block
+    _log_q: float
+    _table: Union[SurvivalTable, None]
+
+    def __init__(self, p0: float, beta: float, rng: np.random.Generator):
+        if p0 < 0 or beta < 0:
+            raise ValueError("p0 and beta must not be negative")
+        if p0 <= 0 and beta <= 0:
+            raise ValueError("machines never fail with p0 = 0 and beta = 0")
+
+        self.p0 = float(p0)
+        self.beta = float(beta)
+        self._rng = rng
+        self._block_size = self.MIN_BLOCK
+        self._blocks = {}
+
+        self._log_q = math.log1p(-self.p0) if self.p0 < 1 else -math.inf
+        self._table = survival_table(self.p0, self.beta) if self.beta > 0 else None
+
+    def failure_ages(self, start_age: int, count: int) -> np.ndarray:
+        """First ages >= `start_age` at which `count` machines break"""
+        e = self._rng.standard_exponential(count)
+
+        if self.beta == 0:
+            if self.p0 >= 1:
+                return np.full(count, start_age, dtype=np.int64)
+            return start_age + (e / -self._log_q).astype(np.int64)
+
+        survival = self._table
+        table = survival.values
+        while len(table) <= start_age and not survival.certain:
+            table = survival.extend()
+        if start_age >= len(table):
+            # Hazard is already >= 1 at this age
+            return np.full(count, start_age, dtype=np.int64)
+
+        # Break at the first age whose conditional survival drops below u
+        targets = e + (table[start_age - 1] if start_age > 0 else 0.0)
+        top = targets.max(initial=0.0)
+        while table[-1] <= top and not survival.certain:
+            table = survival.extend()
+        return np.minimum(np.searchsorted(table, targets, side='right'), len(table) - 1)
+
+    def failure_age(self, start_age: int) -> int:
+        """First age >= `start_age` at which the machine breaks"""
+        try:
+            return self._blocks[start_age]()
+        except (KeyError, StopIteration):
+            ages = self.failure_ages(start_age, self._block_size).tolist()
+            self._block_size = min(2 * self._block_size, self.MAX_BLOCK)
+            self._blocks[start_age] = iter(ages).__next__
+            return self._blocks[start_age]()
+
+
+class EventFactorySimulator:
+    """Event-driven counterpart of `FactorySimulator`.
+
+    Instead of drawing a Bernoulli per machine per tick, each running machine
+    gets its failure tick sampled once, and failures and repair completions
+    (`failure + tr`) are kept in a priority queue. The clock jumps from one
+    event to the next, so the cost of a trial scales with the number of events.
+    """
+
+    n: int  # Number of machines required for the system to work
+    p0: float  # Initial probability of failure
+    s0: int  # Backup Machines
+    beta: float  # Failure increase rate
+    tr: int  # Machine recovery time
+
+    _clock: int
+    _events: list  # heap of (tick, kind)
+    _idle: int
+    _sampler: FailureTimeSampler
+
+    def __init__(self, n: int, p0: float, s0: int, tr: int, beta: float,
+                 seed: int = int(1984), *args, **kwargs):
+        if n is None:
+            raise ValueError("n must not be None")
+        if p0 is None:
+            raise ValueError("p0 must not be None")
+        if s0 is None:
+            raise ValueError("s0 must not be None")
+        if beta is None:
+            raise ValueError("beta must not be None")
+        if tr is None:
+            raise ValueError("tr must not be None")
+
+        self.n = int(n)
+        self.p0 = float(p0)
+        self.s0 = int(s0)
+        self.beta = float(beta)
+        self.tr = int(tr)
+
+        self._clock = int(0)
+        self._idle = self.s0
+        # A seed or a trial's stream (see rng.py)
+        self._sampler = FailureTimeSampler(
+            self.p0, self.beta, np.random.default_rng(seed))
+
+        # Initial machines start at tick 1, so tick 1 is their age 0
+        self._events = [(1 + age, FAILURE)
+                        for age in self._sampler.failure_ages(0, self.n).tolist()]
+        heapq.heapify(self._events)
+
+    def next_event(self):
+        """Advance the clock to the next event tick and handle all its events"""
+        events = self._events
+        clock = events[0][0]
+        self._clock = clock
+
+        n_broken = 0
+        while events and events[0][0] == clock:
+            _, kind = heapq.heappop(events)
+            if kind == REPAIR:
+                self._idle += 1
+            else:
+                n_broken += 1
+                # Repairs are checked from the next tick on, as in `next_state`
+                repair_time = max(self.tr, 1)
+                if repair_time < INF - clock:
+                    heapq.heappush(events, (clock + repair_time, REPAIR))
+
+        # Replacements start at this tick and can only break from the next one
+        recovered = min(n_broken, self._idle)
+        self._idle -= recovered
+        for _ in range(recovered):
+            heapq.heappush(
+                events, (clock + self._sampler.failure_age(1), FAILURE))
+
+        return {
+            'clock': clock,
+            'critical': n_broken > recovered
+        }
+
+
+def event_trial(*args, max_cycles: Union[int, None] = None, deadline: Union[float, None] = None,
+                **kwargs) -> Tuple[int, int, bool]:
+    simulator = EventFactorySimulator(*args, **kwargs)
+
+    # Without spares the availability is already low at the first tick
+    z = 1 if simulator.s0 == 0 else 0
+    events = 0
+    while True:
+        st = simulator.next_event()
+
+        if max_cycles is not None and simulator._clock > max_cycles:
+            # Survived up to max_cycles, the event itself is past the horizon
+            return (max_cycles, z or max_cycles, True)
+
+        if z == 0 and simulator._idle / simulator.s0 < 0.2:
+            z = simulator._clock
+
+        if st['critical']:
+            return (simulator._clock, z, False)
+
+        events += 1
+        if deadline is not None and events % DEADLINE_CHECK_EVENTS == 0 and time.time() > deadline:
+            return (simulator._clock, z or simulator._clock, True)
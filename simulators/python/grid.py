@@ -0,0 +1,203 @@
+import itertools
+import json
+import os
+import queue
+import time
+
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+if __package__:
+    from .simulator import TrialExecutor, select_backend, trial_configs
+    from .storage import TrialsWriter, write_json_atomic
+else:
+    # Run as a script or from `simulators/python` on sys.path
+    from simulator import TrialExecutor, select_backend, trial_configs
+    from storage import TrialsWriter, write_json_atomic
+
+
+"""
+Grid results store:
+    grid.json   {'seed', 'datasets': {name: {'n', 'p0', 's0', 'tr', 'beta'}}}
+    <name>/     trials directory of one config (see storage.py)
+
+Trials only depend on the seed and their index, so an interrupted grid is
+resumed from every dataset's committed `trial_count`.
+"""
+
+GRID_FILE = 'grid.json'
+CONFIG_FIELDS = ('n', 'p0', 's0', 'tr', 'beta')
+
+Config = Tuple[int, float, int, int, float]
+
+
+def grid_configs(n, p0, s0, tr, beta) -> List[Config]:
+    """Cartesian product of `(n, p0, s0, tr, beta)` values, scalars are single values"""
+    axes = [list(v) if isinstance(v, (list, tuple, range)) else [v]
+            for v in (n, p0, s0, tr, beta)]
+    return list(itertools.product(*axes))
+
+
+def config_name(config: Config, seed: int) -> str:
+    def escape(x): return str(x).replace('.', '_')
+    n, p0, s0, tr, beta = config
+    return f'{n}-{escape(p0)}-{s0}-{tr}-{escape(beta)}-{seed}'
+
+
+def model_cost(config: Config) -> float:
+    """Relative cost of one trial: expected ticks from the `tnbinom` mean
+    `(s0 + 1) / (n p0)` times the machines handled per tick"""
+    n, p0, s0, tr, beta = config
+    return (s0 + 1) / (n * max(p0, beta, 1e-12)) * (n + s0)
+
+
+def run_grid(path: str, configs: Iterable[Config], trial_count: int, seed: Union[int, None] = None,
+             backend: str = 'auto', batch_size: int = 4096, chunk_size: int = 1024,
+             max_cycles: Union[int, None] = None,
+             estimate: str = 'model', pilot_trials: int = 16,
+             executor: Union[TrialExecutor, None] = None,
+             progress: Union[Callable[[int, int, float], None], None] = None) -> Dict[Config, str]:
+    """Simulate `trial_count` trials of every config into the store at `path`
+
+    Chunks of every config share the executor's workers, the most expensive
+    configs first: their cost is estimated with `model_cost` or, with
+    `estimate='pilot'`, timed on their first `pilot_trials` trials. Finished
+    configs are skipped and partial ones resumed, so an interrupted grid is
+    completed by running it again. Trials are censored at `max_cycles` ticks.
+
+    Returns:
+        dict: dataset directory of every config
+    """
+
+    configs = list(dict.fromkeys(tuple(c) for c in configs))
+    os.makedirs(path, exist_ok=True)
+
+    grid_path = os.path.join(path, GRID_FILE)
+    grid = {}
+    if os.path.isfile(grid_path):
+        with open(grid_path, 'r') as f:
+            grid = json.load(f)
+
+    if seed is None:
+        seed = grid.get('seed', int(time.time() * 1000))
+    elif grid.get('seed', seed) != seed:
+        raise ValueError(f"{path} holds a grid simulated with another seed")
+
+    datasets = grid.get('datasets', {})
+    for config in configs:
+        datasets[config_name(config, seed)] = dict(zip(CONFIG_FIELDS, config))
+    write_json_atomic(grid_path, {'seed': seed, 'datasets': datasets})
+
+    paths = {config: os.path.join(path, config_name(config, seed))
+             for config in configs}
+    writers = {}
+    buffers = {}  # config -> {start: (results, results_z, censored)}
+    done = 0
+    total = 0
+
+    def write_chunk(config: Config, start: int, *chunk: list):
+        # Chunks finish out of order, datasets are only appended in order
+        buffers[config][start] = chunk
+        writer = writers[config]
+        while writer.trial_count in buffers[config]:
+            writer.append(*buffers[config].pop(writer.trial_count))
+
+    own_executor = executor is None
+    if own_executor:
+        executor = TrialExecutor()
+
+    try:
+        for config in configs:
+            n, p0, s0, tr, beta = config
+            writer = TrialsWriter(paths[config], trial_configs(
+                n, p0, s0, tr, beta, seed, backend, max_cycles), resume=True)
+            if writer.trial_count >= trial_count:
+                writer.close()
+                continue
+
+            writers[config] = writer
+            buffers[config] = {}
+            total += trial_count - writer.trial_count
+
+        begin = time.perf_counter()
+
+        def task(config: Config, start: int, stop: int) -> tuple:
+            n, p0, s0, tr, beta = config
+            return (select_backend(backend, n, p0, s0, tr, beta), n, p0, s0, tr, beta, seed, start, stop, batch_size,
+                    max_cycles, None)
+
+        # Per-trial cost of every pending config
+        costs = {}
+        if estimate == 'pilot':
+            pilots = {}
+            for config, writer in writers.items():
+                stop = min(writer.trial_count + pilot_trials, trial_count)
+                pilots[config] = (writer.trial_count, stop, executor.submit(
+                    task(config, writer.trial_count, stop)))
+
+            for config, (start, stop, result) in pilots.items():
+                *chunk, seconds = result.get()
+                costs[config] = seconds / (stop - start)
+                write_chunk(config, start, *chunk)
+                done += stop - start
+        elif estimate == 'model':
+            costs = {config: model_cost(config) for config in writers}
+        else:
+            raise ValueError(f"Unknown cost estimate: {estimate}")
+
+        if backend == 'batched':
+            chunk_size = -(-chunk_size // batch_size) * batch_size
+
+        # Most expensive configs first, their chunks aligned to multiples of chunk_size
+        tasks = []
+        for config in sorted(writers, key=lambda c: costs[c] * (trial_count - writers[c].trial_count),
+                             reverse=True):
+            start = writers[config].trial_count
+            while start < trial_count:
+                stop = min((start // chunk_size + 1) * chunk_size, trial_count)
+                tasks.append((config, start, stop))
+                start = stop
+
+        finished = queue.Queue()
+        max_pending = 2 * executor.processes
+        pending = 0
+
+        def collect():
+            nonlocal done
+            config, start, result = finished.get()
+            if config is None:
+                raise result
+
+            *chunk, _ = result
+            write_chunk(config, start, *chunk)
+
+            done += len(chunk[0])
+            if progress is not None:
+                progress(done, total, done /
+                         max(time.perf_counter() - begin, 1e-9))
+
+        for config, start, stop in tasks:
+            if pending == max_pending:
+                collect()
+                pending -= 1
+
+            executor.submit(task(config, start, stop),
+                            callback=lambda r, c=config, s=start: finished.put((c, s, r)),
+                            error_callback=lambda e: finished.put((None, None, e)))
+            pending += 1
+
+        while pending:
+            collect()
+            pending -= 1
+    except BaseException:
+        if own_executor:
+            executor.terminate()
+        raise
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    if own_executor:
+        executor.close()
+
+    return paths
+
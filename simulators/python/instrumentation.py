@@ -0,0 +1,119 @@
+import collections
+import time
+
+from typing import Dict
+
+if __package__:
+    from .simulator import FactorySimulator
+else:
+    # Run as a script or from `simulators/python` on sys.path
+    from simulator import FactorySimulator
+
+
+"""
+Opt-in hot path counters of the python backend, enabled by passing a
+`SimulatorCounters` to `factory_trial` / `trial_chunk` (or `instrument=True`
+to `multiple_trials`). The plain `FactorySimulator` is left untouched, so
+disabled instrumentation costs nothing per tick.
+"""
+
+
+class SimulatorCounters:
+    """Event counts and per-phase seconds, merged across trials and workers
+
+    Counts:
+        trials, ticks, draws (failure draws), breaks, repairs (finished),
+        idle_pops (spares put to work), idle_appends (repaired machines
+        made idle)
+
+    Phases (seconds):
+        repairs       popping finished repairs, in `next_state`
+        failures      failure draws of the running machines, in `next_state`
+        replacements  replacing broken machines by idle ones, in `next_state`
+        trial         whole `factory_trial` calls, loop bookkeeping included
+        chunk         whole `trial_chunk` calls, in the workers
+        wall          whole run, in the parent process
+    """
+
+    counts: collections.Counter
+    seconds: collections.Counter
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.seconds = collections.Counter()
+
+    def merge(self, *others: 'SimulatorCounters') -> 'SimulatorCounters':
+        for other in others:
+            self.counts.update(other.counts)
+            self.seconds.update(other.seconds)
+        return self
+
+    def to_dict(self) -> Dict[str, dict]:
+        return {'counts': dict(self.counts), 'seconds': dict(self.seconds)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, dict]) -> 'SimulatorCounters':
+        counters = cls()
+        counters.counts.update(data['counts'])
+        counters.seconds.update(data['seconds'])
+        return counters
+
+    def report(self) -> str:
+        """Human readable summary, rates per second of simulation"""
+        simulated = self.seconds.get('trial') or self.seconds.get('chunk') or 0
+        lines = [f"{name:14} {count:>14,}" + (
+            f" {count / simulated:>14,.0f}/s" if simulated else '')
+            for name, count in sorted(self.counts.items())]
+        lines += [f"{phase:14} {seconds:>14.4f} s"
+                  for phase, seconds in sorted(self.seconds.items())]
+        return '\n'.join(lines)
+
+
+class InstrumentedFactorySimulator(FactorySimulator):
+    """`FactorySimulator` counting its work into `counters`
+
+    Runs the same phases as the plain simulator (so the same states and random
+    draws), timing each of them and counting its work from the change of the
+    idle, repair and vacant positions queues.
+    """
+
+    counters: SimulatorCounters
+
+    def __init__(self, *args, counters: SimulatorCounters, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.counters = counters
+
+    def next_state(self):
+        begin = time.perf_counter()
+        self._clock += 1
+
+        under_repair = len(self._repairs)
+        self._finish_repairs()
+        repairs = under_repair - len(self._repairs)
+        repaired = time.perf_counter()
+
+        vacant = len(self._vacant)
+        self._break_machines()
+        breaks = len(self._vacant) - vacant
+        scanned = time.perf_counter()
+
+        vacant = len(self._vacant)
+        self._replace_machines()
+        pops = vacant - len(self._vacant)
+        replaced = time.perf_counter()
+
+        counts = self.counters.counts
+        counts['ticks'] += 1
+        # One draw per machine working at the start of the tick
+        counts['draws'] += self.n - (vacant - breaks)
+        counts['breaks'] += breaks
+        counts['repairs'] += repairs
+        counts['idle_appends'] += repairs
+        counts['idle_pops'] += pops
+
+        seconds = self.counters.seconds
+        seconds['repairs'] += repaired - begin
+        seconds['failures'] += scanned - repaired
+        seconds['replacements'] += replaced - scanned
+
+        return self._state()
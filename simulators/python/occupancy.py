@@ -0,0 +1,164 @@
+import numpy as np
+
+from typing import Dict, Iterable, List, Union
+
+
+"""
+Per-tick occupancy of the fleet aggregated over trials, enabled with
+`multiple_trials(occupancy=True)` (python backend only).
+
+Every trial reports its running, idle and under-repair machine counts at
+ticks `every, 2 every, ..` up to `horizon`. They are folded into per-tick
+sums and histograms right away, so memory only depends on the horizon and
+not on the number of trials. Curves of different chunks or workers merge
+by adding their accumulators.
+"""
+
+STATES = ('running', 'idle', 'repair')
+
+# Default horizon when trials are not cut at max_cycles
+DEFAULT_HORIZON = 1000
+
+# Histogram bins per tick, machine counts are only grouped for larger fleets
+MAX_BINS = 4096
+
+
+class OccupancyCurves:
+    """Per-tick accumulators of the machine counts of every state
+
+    A trial only contributes to the ticks it reached: `alive[k]` is the number
+    of trials still running at tick `ticks[k]` (the critical or censoring tick
+    included), and statistics of that tick are over those trials.
+
+    Histograms hold every count exactly (`bin_size == 1`) unless the fleet
+    needs more than `max_bins` bins. Grouped bins are aligned so the largest
+    count of each state (`n` running, `s0` idle, `n + s0` under repair) is the
+    top of its bin, and quantiles report the top of their bin.
+    """
+
+    n: int
+    s0: int
+    size: int  # n + s0, largest count of any state
+    horizon: int
+    every: int
+    bin_size: int
+
+    alive: np.ndarray  # (ticks,)
+    sums: np.ndarray  # (states, ticks)
+    squares: np.ndarray  # (states, ticks)
+    histogram: np.ndarray  # (states, ticks, bins), (count + offset) // bin_size
+    _offsets: np.ndarray  # (states,) aligning the largest count to a bin top
+
+    def __init__(self, n: int, s0: int, horizon: int = DEFAULT_HORIZON, every: int = 1,
+                 max_bins: int = MAX_BINS, bin_size: Union[int, None] = None):
+        if horizon < 1 or every < 1:
+            raise ValueError("horizon and every must be positive")
+
+        self.n = int(n)
+        self.s0 = int(s0)
+        self.size = self.n + self.s0
+        self.horizon = int(horizon)
+        self.every = int(every)
+        self.bin_size = int(bin_size) if bin_size is not None else max(
+            1, -(-(self.size + 1) // int(max_bins)))
+
+        tops = np.array([self.n, self.s0, self.size], dtype=np.int64)
+        self._offsets = (self.bin_size - 1 - tops) % self.bin_size
+
+        ticks = self.horizon // self.every
+        bins = (self.size + self.bin_size - 1) // self.bin_size + 1
+        self.alive = np.zeros(ticks, dtype=np.int64)
+        self.sums = np.zeros((len(STATES), ticks), dtype=np.int64)
+        self.squares = np.zeros((len(STATES), ticks), dtype=np.int64)
+        self.histogram = np.zeros(
+            (len(STATES), ticks, bins), dtype=np.int32)
+
+    @property
+    def spec(self) -> tuple:
+        """Arguments building an empty, mergeable copy"""
+        return self.n, self.s0, self.horizon, self.every, MAX_BINS, self.bin_size
+
+    @property
+    def ticks(self) -> np.ndarray:
+        return np.arange(1, len(self.alive) + 1) * self.every
+
+    def records(self, clock: int) -> bool:
+        """Whether tick `clock` is sampled"""
+        return clock <= self.horizon and clock % self.every == 0
+
+    def add_trial(self, running: List[int], idle: List[int], repair: List[int]):
+        """Fold the counts of one trial at its sampled ticks (see `records`)"""
+        values = np.array([running, idle, repair], dtype=np.int64)
+        length = values.shape[1]
+        if length == 0:
+            return
+
+        self.alive[:length] += 1
+        self.sums[:, :length] += values
+        self.squares[:, :length] += values * values
+
+        # Every (state, tick) pair appears once, so plain fancy indexing adds
+        states, ticks = np.indices(values.shape)
+        bins = (values + self._offsets[:, None]) // self.bin_size
+        self.histogram[states, ticks, bins] += 1
+
+    def _compatible(self, other: 'OccupancyCurves') -> bool:
+        return (self.n, self.s0, self.horizon, self.every, self.bin_size) == \
+            (other.n, other.s0, other.horizon, other.every, other.bin_size)
+
+    def merge(self, *others: 'OccupancyCurves') -> 'OccupancyCurves':
+        for other in others:
+            if not self._compatible(other):
+                raise ValueError("curves must share n, s0, horizon, every and bins")
+
+            self.alive += other.alive
+            self.sums += other.sums
+            self.squares += other.squares
+            self.histogram += other.histogram
+        return self
+
+    def mean(self) -> np.ndarray:
+        """(states, ticks) mean counts, nan once no trial is left"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sums / self.alive
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.sums / self.alive
+            variance = (self.squares - self.alive * mean * mean) / \
+                (self.alive - ddof)
+        return np.sqrt(np.maximum(variance, 0))
+
+    def quantile(self, q: float) -> np.ndarray:
+        """(states, ticks) lowest count with a CDF reaching `q`, nan once no
+        trial is left. Grouped histograms give the top of the count's bin, so
+        the result is never below the exact quantile."""
+        cumulative = np.cumsum(self.histogram, axis=2)
+        threshold = np.ceil(q * self.alive)[None, :, None]
+        index = np.argmax(cumulative >= np.maximum(threshold, 1), axis=2)
+        top = (index + 1) * self.bin_size - 1 - self._offsets[:, None]
+        return np.where(self.alive > 0, top, np.nan)
+
+    def to_dict(self, quantiles: Iterable[float] = (0.05, 0.5, 0.95)) -> Dict[str, Union[list, dict]]:
+        """JSON-friendly curves: `{'ticks', 'alive', 'bin_size', 'exact', state: {'mean', 'std', 'quantiles'}}`
+
+        `exact` is false when counts were grouped into bins of `bin_size`, the
+        quantiles are then rounded up to the top of their bin.
+        """
+        quantiles = list(quantiles)
+        mean = self.mean()
+        std = self.std()
+        curves = [self.quantile(q) for q in quantiles]
+
+        def values(array: np.ndarray) -> list:
+            return [None if np.isnan(x) else float(x) for x in array]
+
+        data = {'ticks': self.ticks.tolist(), 'alive': self.alive.tolist(),
+                'bin_size': self.bin_size, 'exact': self.bin_size == 1}
+        for i, state in enumerate(STATES):
+            data[state] = {
+                'mean': values(mean[i]),
+                'std': values(std[i]),
+                'quantiles': {str(q): values(curve[i]) for q, curve in zip(quantiles, curves)},
+            }
+        return data
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+"""
+Per-trial random streams, derived in O(1) from `(seed, trial index)`.
+
+Trial `i` of a run seeded with `seed` draws from the counter-based Philox
+generator keyed by `(seed, i)`, starting at counter 0. Streams of different
+keys are independent, and no trial depends on how trials are chunked or on
+the worker running it, so serial, pool and batched runs agree.
+
+Building a generator costs more than a short trial, so `TrialStreams` keeps
+one per process and only re-keys it for every trial.
+"""
+
+MASK64 = int(2 ** 64 - 1)
+
+
+def trial_key(seed: int, index: int) -> np.ndarray:
+    """128-bit Philox key of trial `index`"""
+    return np.array([int(seed) & MASK64, int(index) & MASK64], dtype=np.uint64)
+
+
+def trial_generator(seed: int, index: int) -> np.random.Generator:
+    """Fresh generator of trial `index`'s stream"""
+    return np.random.Generator(np.random.Philox(key=trial_key(seed, index)))
+
+
+class TrialStreams:
+    """Streams of every trial of a run, sharing a single generator
+
+    `stream(i)` rewinds the shared generator to the start of trial `i`'s
+    stream and returns it, so it is only valid until the next call.
+    """
+
+    seed: int
+
+    _bit_generator: np.random.Philox
+    _generator: np.random.Generator
+    _state: dict  # Philox state at counter 0, only the key changes
+
+    def __init__(self, seed: int):
+        self.seed = int(seed)
+        self._bit_generator = np.random.Philox(key=trial_key(self.seed, 0))
+        self._generator = np.random.Generator(self._bit_generator)
+
+        zeros = np.zeros(4, dtype=np.uint64)
+        self._state = {
+            'bit_generator': 'Philox',
+            'state': {'counter': zeros, 'key': None},
+            'buffer': zeros,
+            'buffer_pos': 4,
+            'has_uint32': 0,
+            'uinteger': 0,
+        }
+
+    def stream(self, index: int) -> np.random.Generator:
+        self._state['state']['key'] = trial_key(self.seed, index)
+        self._bit_generator.state = self._state
+        return self._generator
@@ -1,33 +1,76 @@
 #!/usr/bin/python3
 
-import random
 import collections
 import sys
 import os
 import time
 import json
 import multiprocessing
+import multiprocessing.pool
+
+import numpy as np
+
+from typing import Callable, Union
+
+if __package__:
+    from .arrays import array_trial
+    from .batched import batched_trials
+    from .counting import counting_trial
+    from .events import event_trial
+    from .occupancy import DEFAULT_HORIZON, OccupancyCurves
+    from .rng import TrialStreams, trial_generator
+    from .stats import TrialStats
+else:
+    # Run as a script or from `simulators/python` on sys.path
+    from arrays import array_trial
+    from batched import batched_trials
+    from counting import counting_trial
+    from events import event_trial
+    from occupancy import DEFAULT_HORIZON, OccupancyCurves
+    from rng import TrialStreams, trial_generator
+    from stats import TrialStats
 
 
 INF = int(2 ** 63 - 1)
 
+# Ticks between wall-clock budget checks
+DEADLINE_CHECK_TICKS = 1024
+
+# Most trials simulated in one chunk, bounding the raw results held at once
+MAX_CHUNK_SIZE = 65536
+
 
 class FactorySimulator:
+    # Uniform draws are generated in blocks growing from MIN_BLOCK to MAX_BLOCK
+    MIN_BLOCK = 64
+    MAX_BLOCK = 65536
+
     n: int  # Number of machines required for the system to work
     p0: float  # Initial probability of failure
     s0: int  # Backup Machines
     beta: float  # Failure increase rate
     tr: int  # Machine recovery time
+    max_cycles: Union[int, None]  # Ticks after which a trial is censored
 
-    _rng: random.Random
+    _rng: np.random.Generator
     _clock: int
 
+    _uniforms: list  # Current block of draws
+    _uniform_index: int  # Next unused draw
+    _block_size: int
+
     _machines: list  # (id, run_begin, repair_end)
     _running: int
     _idle: collections.deque
 
+    # Machine working at each of the n positions, None when left empty
+    _positions: list
+    _vacant: list  # Empty positions, only once the system is critical
+    # Machines under repair, `tr` is constant so they finish in this order
+    _repairs: collections.deque
+
     def __init__(self, n: int, p0: float, s0: int, tr: int, beta: float,
-                 seed: int = int(1984), *args, **kwargs):
+                 seed: int = int(1984), max_cycles: Union[int, None] = None, *args, **kwargs):
         if n is None:
             raise ValueError("n must not be None")
         if p0 is None:
@@ -44,9 +87,15 @@ class FactorySimulator:
         self.s0 = int(s0)
         self.beta = float(beta)
         self.tr = int(tr)
+        self.max_cycles = None if max_cycles is None else int(max_cycles)
 
         self._clock = int(0)
-        self._rng = random.Random(seed)
+        # A seed or a trial's stream (see rng.py)
+        self._rng = np.random.default_rng(seed)
+
+        self._uniforms = []
+        self._uniform_index = 0
+        self._block_size = self.MIN_BLOCK
 
         running_machines = [[i, 1, 0] for i in range(0, self.n)]
         idle_machines = [[i, 0, 0] for i in range(self.n, self.n + self.s0)]
@@ -54,6 +103,10 @@ class FactorySimulator:
         self._running = int(self.n)
         self._idle = collections.deque(idle_machines)
 
+        self._positions = running_machines
+        self._vacant = []
+        self._repairs = collections.deque()
+
     @property
     def machines(self):
         return self._machines
@@ -61,51 +114,108 @@ class FactorySimulator:
     def _p(self, machine: list) -> float:
         return self.p0 + self.beta * (self._clock - machine[1])
 
-    def _break(self, machine: list) -> bool:
-        return self._rng.random() <= self._p(machine)
-
-    def next_state(self):
-        self._clock += 1
-
-        n_broken = self.n - self._running
-        for machine in self._machines:
-            if machine[2] != 0 and machine[2] <= self._clock:
-                # print(f"Repair {machine}")
-                machine[2] = 0
-                self._idle.append(machine)
-
-            if machine[1] != 0 and self._break(machine):
+    def _draws(self) -> int:
+        """Offset in `_uniforms` of the tick's `n` draws, one per position"""
+        offset = self._uniform_index
+        if offset + self.n > len(self._uniforms):
+            size = max(self._block_size, self.n)
+            self._uniforms = self._rng.random(size).tolist()
+            self._block_size = min(2 * size, self.MAX_BLOCK)
+            offset = 0
+
+        self._uniform_index = offset + self.n
+        return offset
+
+    def _finish_repairs(self):
+        """Machines whose repair is over become idle"""
+        repairs = self._repairs
+        while repairs and repairs[0][2] <= self._clock:
+            machine = repairs.popleft()
+            # print(f"Repair {machine}")
+            machine[2] = 0
+            self._idle.append(machine)
+
+    def _break_machines(self):
+        """One failure draw per working machine, broken ones leave their position"""
+        repairs = self._repairs
+        positions = self._positions
+        offset = self._draws()
+        draws = self._uniforms
+        for position, machine in enumerate(positions):
+            if machine is not None and draws[offset + position] <= self._p(machine):
                 # print(f"Broken {machine}")
                 machine[2] = self._clock + self.tr
                 machine[1] = 0
-                n_broken += 1
-
-        while n_broken > 0 and len(self._idle) > 0:
+                repairs.append(machine)
+                positions[position] = None
+                self._vacant.append(position)
+
+    def _replace_machines(self):
+        """Idle machines take the empty positions"""
+        positions = self._positions
+        while self._vacant and len(self._idle) > 0:
             target = self._idle.popleft()
             # print(f"Recovered {target}")
             target[1] = self._clock
-            n_broken -= 1
+            positions[self._vacant.pop()] = target
 
-        self._running = self.n - n_broken
+        self._running = self.n - len(self._vacant)
         assert self._running <= self.n
 
+    def _state(self) -> dict:
+        critical = self._running < self.n
         return {
             'clock': self._clock,
-            'critical': self._running < self.n
+            'critical': critical,
+            'censored': not critical and self.max_cycles is not None and self._clock >= self.max_cycles
         }
 
+    def next_state(self):
+        self._clock += 1
+        self._finish_repairs()
+        self._break_machines()
+        self._replace_machines()
+        return self._state()
+
+
+def factory_trial(*args, deadline: Union[float, None] = None, counters=None,
+                  occupancy: Union[OccupancyCurves, None] = None, **kwargs):
+    """Runs a trial until it becomes critical, returns `(n, z, censored)`
+
+    Trials reaching `max_cycles`, or still running at the `deadline`
+    (`time.time()` seconds), are censored at the current tick. Passing
+    `counters` (see `instrumentation.py`) counts the trial's work into them,
+    and the trial's machine counts are folded into `occupancy` curves.
+    """
+    simulator_class = FactorySimulator
+    if counters is not None:
+        if __package__:
+            from .instrumentation import InstrumentedFactorySimulator
+        else:
+            from instrumentation import InstrumentedFactorySimulator
+        simulator_class = InstrumentedFactorySimulator
+        kwargs['counters'] = counters
+        begin = time.perf_counter()
 
-def factory_trial(*args, **kwargs):
     if isinstance(args[0], tuple):
-        simulator = FactorySimulator(*args[0])
+        simulator = simulator_class(*args[0], **kwargs)
     else:
-        simulator = FactorySimulator(*args, **kwargs)
+        simulator = simulator_class(*args, **kwargs)
+
+    if occupancy is not None:
+        running, idle, repair = [], [], []
 
     n = 0
     z = 0
+    censored = False
     while True:
         st = simulator.next_state()
 
+        if occupancy is not None and occupancy.records(simulator._clock):
+            running.append(simulator._running)
+            idle.append(len(simulator._idle))
+            repair.append(len(simulator._repairs))
+
         availability = 0 if simulator.s0 == 0 else len(
             simulator._idle) / simulator.s0
         if z == 0 and availability < 0.2:
@@ -115,38 +225,440 @@ def factory_trial(*args, **kwargs):
             n = simulator._clock
             break
 
+        if st['censored'] or (deadline is not None and simulator._clock % DEADLINE_CHECK_TICKS == 0
+                              and time.time() > deadline):
+            n = simulator._clock
+            censored = True
+            break
+
     if z == 0:
         z = n
 
-    return (n, z)
+    if counters is not None:
+        counters.counts['trials'] += 1
+        counters.seconds['trial'] += time.perf_counter() - begin
+
+    if occupancy is not None:
+        occupancy.add_trial(running, idle, repair)
+
+    return (n, z, censored)
+
+
+# Backends that run one trial per call, `trial(n, p0, s0, tr, beta, rng, ...)`
+TRIAL_BACKENDS = {
+    'python': factory_trial,
+    'events': event_trial,
+    'counting': counting_trial,
+    'arrays': array_trial,
+}
+
+# Fleets from this many machines with failures on most ticks are simulated
+# with whole-array ticks, skipping quiet ticks no longer pays off
+ARRAY_MIN_FLEET = 1000
+
+
+def select_backend(backend: str, n: int, p0: float, s0: int, tr: int, beta: float) -> str:
+    """Resolve `backend='auto'` to the fastest backend supporting the config,
+    for every entry point (`analysis/common/backends.py` included)"""
+    if backend != 'auto':
+        return backend
+
+    if beta == 0 and p0 > 0:
+        # Without aging machines are exchangeable and counting is enough
+        return 'counting'
+    if n >= ARRAY_MIN_FLEET and n * p0 >= 1:
+        return 'arrays'
+    if p0 > 0 or beta > 0:
+        # Jump between failures and repairs
+        return 'events'
+    return 'python'
+
+
+def trial_chunk(args: tuple, counters=None, occupancy: Union[OccupancyCurves, None] = None):
+    """Runs trials `start .. stop - 1`, returns `(results, results_z, censored)`
+
+    Past the `deadline` no new trial (or batch) is started, so the chunk may
+    hold fewer trials: always a prefix of the requested range.
+
+    `counters` collect the chunk's instrumentation, only the python backend
+    counts its per-tick work, other backends count trials and chunk time.
+    Trials are folded into `occupancy` curves (python backend only).
+    """
+    backend, n, p0, s0, tr, beta, seed, start, stop, batch_size, max_cycles, deadline = args
+
+    if occupancy is not None and backend != 'python':
+        raise ValueError("occupancy curves require the python backend")
+
+    if counters is not None:
+        begin = time.perf_counter()
+
+    results = []
+    if backend in TRIAL_BACKENDS:
+        trial = TRIAL_BACKENDS[backend]
+        extra = {}
+        if counters is not None and backend == 'python':
+            extra['counters'] = counters
+        if occupancy is not None:
+            extra['occupancy'] = occupancy
+        # Every trial draws from its own Philox stream (see rng.py)
+        streams = TrialStreams(seed)
+        for i in range(start, stop):
+            if deadline is not None and time.time() > deadline:
+                break
+            results.append(trial(n, p0, s0, tr, beta, streams.stream(i),
+                                 max_cycles=max_cycles, deadline=deadline, **extra))
+    elif backend == 'batched':
+        # Batches always cover [k * batch_size, (k + 1) * batch_size) and draw
+        # from their first trial's stream, so results don't depend on the range
+        first = start - start % batch_size
+        for i in range(first, stop, batch_size):
+            if deadline is not None and time.time() > deadline:
+                break
+            batch = batched_trials(n, p0, s0, tr, beta, batch_size, trial_generator(seed, i),
+                                   max_cycles=max_cycles, deadline=deadline)
+            results.extend(batch[max(start - i, 0):stop - i])
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    if counters is not None:
+        if backend != 'python':
+            counters.counts['trials'] += len(results)
+        counters.counts['chunks'] += 1
+        counters.seconds['chunk'] += time.perf_counter() - begin
 
+    return [r[0] for r in results], [r[1] for r in results], [r[2] for r in results]
 
-def multiple_trials(trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int, parallel: bool = True, parallel_threshold: int = 10000):
-    rng = random.Random(seed)
-    seeds = [rng.randint(0, INF) for _ in range(trial_count)]
 
-    if not parallel or trial_count < parallel_threshold:
-        results = [factory_trial(n, p0, s0, tr, beta, seed=seeds[i])
-                   for i in range(trial_count)]
+def new_counters():
+    if __package__:
+        from .instrumentation import SimulatorCounters
     else:
-        pool = multiprocessing.Pool()
-        results = pool.map(
-            factory_trial, [(n, p0, s0, tr, beta, s) for s in seeds])
+        from instrumentation import SimulatorCounters
+    return SimulatorCounters()
+
+
+def timed_trial_chunk(task: tuple, summarize: bool = False, instrument: bool = False,
+                      occupancy: Union[tuple, None] = None):
+    """`trial_chunk` followed by its seconds. With `instrument` or an `occupancy`
+    spec (see `OccupancyCurves.spec`) a dict of the chunk's `'counters'` and
+    `'occupancy'` curves is appended."""
+    begin = time.perf_counter()
+    counters = new_counters() if instrument else None
+    curves = None if occupancy is None else OccupancyCurves(*occupancy)
+    chunk = trial_chunk(task, counters, curves)
+    if summarize:
+        # Only the summary goes back to the parent process
+        chunk = (TrialStats().update(*chunk),)
+    if instrument or curves is not None:
+        return (*chunk, time.perf_counter() - begin, {'counters': counters, 'occupancy': curves})
+    return (*chunk, time.perf_counter() - begin)
+
+
+def chunk_length(chunk) -> int:
+    """Number of trials in a `(results, results_z, censored)` chunk or a `TrialStats`"""
+    return chunk.count if isinstance(chunk, TrialStats) else len(chunk[0])
+
+
+class TrialExecutor:
+    """Persistent pool of warm workers running `(config, trial range)` chunks.
+
+    The pool is created once and reused across runs. Chunk sizes adapt to the
+    measured per-trial cost of each config so a chunk takes about
+    `target_chunk_seconds`: cheap trials are sent in large chunks (little IPC
+    per trial) and expensive ones in small chunks (good load balancing).
+
+    `progress(done, total, trials_per_second)` is called after every chunk.
+    """
+
+    processes: int
+    target_chunk_seconds: float
+    min_chunk: int
+    max_chunk: int
+    progress: Union[Callable[[int, int, float], None], None]
+
+    _pool: multiprocessing.pool.Pool
+    _trial_cost: dict  # config -> seconds per trial
+
+    def __init__(self, processes: Union[int, None] = None, target_chunk_seconds: float = 0.25,
+                 min_chunk: int = 8, max_chunk: int = MAX_CHUNK_SIZE,
+                 progress: Union[Callable[[int, int, float], None], None] = None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.target_chunk_seconds = float(target_chunk_seconds)
+        self.min_chunk = int(min_chunk)
+        self.max_chunk = int(max_chunk)
+        self.progress = progress
+
+        self._pool = multiprocessing.Pool(self.processes)
+        self._trial_cost = {}
+
+    def _chunk_size(self, config: tuple, remaining: int, batch_size: int) -> int:
+        cost = self._trial_cost.get(config)
+        if cost is None:
+            # Small pilot chunks until the first ones report their cost
+            size = self.min_chunk
+        else:
+            size = int(self.target_chunk_seconds / max(cost, 1e-9))
+
+        # Leave work for every worker near the end of the run
+        size = min(size, -(-remaining // self.processes), self.max_chunk)
+        size = max(size, self.min_chunk)
+
+        if config[0] == 'batched':
+            size = -(-size // batch_size) * batch_size
+        return size
+
+    def _record_cost(self, config: tuple, cost: float):
+        previous = self._trial_cost.get(config)
+        self._trial_cost[config] = cost if previous is None else (
+            previous + cost) / 2
+
+    def submit(self, task: tuple, callback: Union[Callable, None] = None,
+               error_callback: Union[Callable, None] = None,
+               summarize: bool = False, instrument: bool = False,
+               occupancy: Union[tuple, None] = None) -> multiprocessing.pool.AsyncResult:
+        """Run one `trial_chunk` task, resolving to `(results, results_z, censored, seconds)`,
+        or `(TrialStats, seconds)` when the worker should `summarize` its chunk.
+        With `instrument` or `occupancy` the worker's collected counters and
+        curves are appended (see `timed_trial_chunk`)."""
+        return self._pool.apply_async(timed_trial_chunk, (task, summarize, instrument, occupancy),
+                                      callback=callback, error_callback=error_callback)
+
+    def stream(self, trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int,
+               backend: str = 'auto', batch_size: int = 4096, trial_offset: int = 0,
+               progress: Union[Callable[[int, int, float], None], None] = None,
+               max_cycles: Union[int, None] = None, deadline: Union[float, None] = None,
+               summarize: bool = False, counters=None,
+               occupancy: Union[OccupancyCurves, None] = None):
+        """Yields `(results, results_z, censored)` chunks in trial order, stopping
+        after the first chunk cut short by the `deadline`. With `summarize` every
+        chunk is reduced to a `TrialStats` by its worker, which is yielded instead.
+        Workers' instrumentation and occupancy curves are merged into `counters`
+        and `occupancy` when given."""
+        backend = select_backend(backend, n, p0, s0, tr, beta)
+        if backend not in TRIAL_BACKENDS and backend != 'batched':
+            raise ValueError(f"Unknown backend: {backend}")
+
+        config = (backend, n, p0, s0, tr, beta)
+        progress = progress or self.progress
+
+        end = trial_offset + trial_count
+        start = trial_offset
+        pending = collections.deque()  # (AsyncResult, size)
+        max_pending = 2 * self.processes
+
+        done = 0
+        begin = time.perf_counter()
+        try:
+            while start < end or pending:
+                while start < end and len(pending) < max_pending:
+                    stop = min(start + self._chunk_size(config,
+                               end - start, batch_size), end)
+                    task = (*config, seed, start, stop,
+                            batch_size, max_cycles, deadline)
+                    pending.append((self.submit(
+                        task, summarize=summarize, instrument=counters is not None,
+                        occupancy=None if occupancy is None else occupancy.spec), stop - start))
+                    start = stop
+
+                result, size = pending.popleft()
+                output = result.get()
+                if counters is not None or occupancy is not None:
+                    *output, collected = output
+                    if counters is not None:
+                        counters.merge(collected['counters'])
+                    if occupancy is not None:
+                        occupancy.merge(collected['occupancy'])
+                *chunk, seconds = output
+                chunk = chunk[0] if summarize else tuple(chunk)
+                count = chunk_length(chunk)
+                if count:
+                    self._record_cost(config, seconds / count)
+
+                done += count
+                if progress is not None:
+                    progress(done, trial_count, done /
+                             max(time.perf_counter() - begin, 1e-9))
+
+                yield chunk
+
+                if count < size:
+                    # Out of time, later chunks are empty or cut short too
+                    for result, _ in pending:
+                        result.wait()
+                    return
+        except (GeneratorExit, Exception):
+            # Consumer stopped early or a chunk failed, let in-flight chunks
+            # finish so the pool stays usable for later runs
+            for result, _ in pending:
+                result.wait()
+            raise
+        except BaseException:
+            # Interrupted, running chunks are abandoned
+            self.terminate()
+            raise
+
+    def close(self):
+        """Graceful shutdown, waits for submitted chunks"""
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+
+def stream_trials(trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int, parallel: bool = True, parallel_threshold: int = 10000, backend: str = 'auto', batch_size: int = 4096, chunk_size: int = MAX_CHUNK_SIZE, trial_offset: int = 0, executor: Union[TrialExecutor, None] = None, progress: Union[Callable[[int, int, float], None], None] = None, max_cycles: Union[int, None] = None, time_budget: Union[float, None] = None, summarize: bool = False, counters=None, occupancy: Union[OccupancyCurves, None] = None):
+    """Yields `(results, results_z, censored)` chunks of at most `chunk_size`
+    trials, in trial order, keeping only a bounded number of chunks in memory.
+    With `summarize` every chunk is yielded as a `TrialStats` instead, built
+    by the worker which simulated it. Instrumentation of every chunk is merged
+    into `counters` when given (see `instrumentation.py`), and trials are
+    folded into `occupancy` curves when given.
+
+    Trials `trial_offset .. trial_offset + trial_count - 1` are generated, each
+    trial only depends on `seed` and its index, so runs can be extended later.
+    Pass an `executor` to reuse its warm workers instead of a temporary pool.
+
+    Trials are censored at `max_cycles` ticks. Once `time_budget` seconds have
+    passed running trials are censored and no new ones are started, so fewer
+    trials may be yielded (still a prefix of the requested range).
+    """
+    backend = select_backend(backend, n, p0, s0, tr, beta)
+    if backend not in TRIAL_BACKENDS and backend != 'batched':
+        raise ValueError(f"Unknown backend: {backend}")
+
+    deadline = None if time_budget is None else time.time() + time_budget
+
+    if executor is not None:
+        yield from executor.stream(trial_count, n, p0, s0, tr, beta, seed, backend,
+                                   batch_size, trial_offset, progress, max_cycles, deadline,
+                                   summarize, counters, occupancy)
+        return
+
+    if parallel and trial_count >= parallel_threshold:
+        with TrialExecutor(max_chunk=chunk_size, progress=progress) as executor:
+            yield from executor.stream(trial_count, n, p0, s0, tr, beta, seed, backend,
+                                       batch_size, trial_offset, None, max_cycles, deadline,
+                                       summarize, counters, occupancy)
+        return
+
+    if backend == 'batched':
+        chunk_size = -(-chunk_size // batch_size) * batch_size
+
+    # Chunk boundaries are aligned to multiples of chunk_size
+    end = trial_offset + trial_count
+    start = trial_offset
+    begin = time.perf_counter()
+    while start < end:
+        stop = min((start // chunk_size + 1) * chunk_size, end)
+        chunk = trial_chunk((backend, n, p0, s0, tr, beta, seed,
+                            start, stop, batch_size, max_cycles, deadline), counters, occupancy)
+        yield TrialStats().update(*chunk) if summarize else chunk
+
+        done = start + len(chunk[0]) - trial_offset
+        if progress is not None:
+            progress(done, trial_count, done /
+                     max(time.perf_counter() - begin, 1e-9))
+
+        if len(chunk[0]) < stop - start:
+            # Out of time
+            return
+        start = stop
+
+
+def trial_configs(n: int, p0: float, s0: int, tr: int, beta: float, seed: int, backend: str,
+                  max_cycles: Union[int, None] = None) -> dict:
+    configs = {
+        'n': n,
+        'p0': p0,
+        's0': s0,
+        'tr': tr,
+        'beta': beta,
+        'seed': seed,
+        'backend': select_backend(backend, n, p0, s0, tr, beta)
+    }
 
+    if max_cycles is not None:
+        configs['max_cycles'] = max_cycles
+
+    return configs
+
+
+def multiple_trials(trial_count: int, n: int, p0: float, s0: int, tr: int, beta: float, seed: int, parallel: bool = True, parallel_threshold: int = 10000, backend: str = 'auto', batch_size: int = 4096, trial_offset: int = 0, executor: Union[TrialExecutor, None] = None, progress: Union[Callable[[int, int, float], None], None] = None, max_cycles: Union[int, None] = None, time_budget: Union[float, None] = None, stats: bool = False, keep_results: bool = True, instrument: bool = False, occupancy: bool = False, horizon: Union[int, None] = None, every: int = 1):
+    """Simulate trials `trial_offset ..` of a config
+
+    With `stats` the data also holds the `TrialStats` of the run as a dict
+    (see `TrialStats.to_dict`). Without `keep_results` only that summary is
+    returned: workers summarize their own chunks, so the memory used does not
+    grow with `trial_count`.
+
+    With `instrument` the data also holds the run's `SimulatorCounters`, merged
+    across workers, as a dict under 'instrumentation'.
+
+    With `occupancy` the data also holds per-tick curves of the running, idle
+    and under-repair machine counts across trials under 'occupancy' (see
+    `OccupancyCurves.to_dict`), sampled every `every` ticks up to `horizon`
+    (`max_cycles` or `DEFAULT_HORIZON` by default). They need the python
+    backend, which 'auto' then selects.
+    """
+    if occupancy and backend == 'auto':
+        backend = 'python'
+    backend = select_backend(backend, n, p0, s0, tr, beta)
+    summarize = stats and not keep_results
+    counters = new_counters() if instrument else None
+    curves = None
+    if occupancy:
+        curves = OccupancyCurves(
+            n, s0, horizon or max_cycles or DEFAULT_HORIZON, every)
+    begin = time.perf_counter()
+
+    # Enough chunks to keep every worker busy, bounded so summarizing stays
+    # in constant memory
+    chunk_size = max(1, min(-(-trial_count // (4 * multiprocessing.cpu_count())),
+                            MAX_CHUNK_SIZE))
+
+    results = []
+    results_z = []
+    censored = []
+    summary = TrialStats()
+    for chunk in stream_trials(trial_count, n, p0, s0, tr, beta, seed, parallel, parallel_threshold, backend, batch_size, chunk_size, trial_offset, executor, progress, max_cycles, time_budget, summarize, counters, curves):
+        if summarize:
+            summary.merge(chunk)
+            continue
+
+        results.extend(chunk[0])
+        results_z.extend(chunk[1])
+        censored.extend(chunk[2])
+        if stats:
+            summary.update(*chunk)
+
+    # Fewer trials than requested when the time budget ran out
     data = {
-        'trial_count': trial_count,
-        'configs': {
-            'n': n,
-            'p0': p0,
-            's0': s0,
-            'tr': tr,
-            'beta': beta,
-            'seed': seed
-        },
-        'results': [r[0] for r in results],
-        'results_z': [r[1] for r in results]
+        'trial_count': summary.count if summarize else len(results),
+        'configs': trial_configs(n, p0, s0, tr, beta, seed, backend, max_cycles),
     }
 
+    if keep_results:
+        data['results'] = results
+        data['results_z'] = results_z
+        data['censored'] = censored
+    if stats:
+        data['stats'] = summary.to_dict()
+    if instrument:
+        counters.seconds['wall'] += time.perf_counter() - begin
+        data['instrumentation'] = counters.to_dict()
+    if occupancy:
+        data['occupancy'] = curves.to_dict()
+
     return data
 
 
@@ -167,7 +679,36 @@ if __name__ == '__main__':
     beta = 0 if len(sys.argv) < 7 else float(sys.argv[6])
     seed = int(time.time() * 1000) if len(sys.argv) < 8 else int(sys.argv[7])
 
-    data = multiple_trials(trial_count, n, p0, s0, tr, beta, seed)
+    backend = os.environ.get('SIM_BACKEND', 'auto')
+    output = os.environ.get('SIM_OUTPUT')
+    trial_offset = int(os.environ.get('SIM_TRIAL_OFFSET', 0))
+
+    # Same convention as the Rust simulator, non-positive means no limit
+    max_cycles = int(os.environ.get('SIM_MAX_CYCLES', -1))
+    max_cycles = max_cycles if max_cycles > 0 else None
+    time_budget = os.environ.get('SIM_TIME_BUDGET')
+    time_budget = None if time_budget is None else float(time_budget)
+
+    # '1' adds summary statistics to the output, 'only' outputs nothing else
+    stats = os.environ.get('SIM_STATS', '').lower()
+
+    if output:
+        # Stream straight into a binary trials directory
+        if __package__:
+            from .storage import write_trials
+        else:
+            from storage import write_trials
+
+        configs = trial_configs(n, p0, s0, tr, beta, seed, backend, max_cycles)
+        write_trials(output, configs, stream_trials(
+            trial_count, n, p0, s0, tr, beta, seed, backend=backend,
+            trial_offset=trial_offset, max_cycles=max_cycles, time_budget=time_budget))
+        exit(0)
+
+    data = multiple_trials(trial_count, n, p0, s0, tr, beta, seed,
+                           backend=backend, trial_offset=trial_offset,
+                           max_cycles=max_cycles, time_budget=time_budget,
+                           stats=stats in ('1', 'only'), keep_results=stats != 'only')
 
     def escape(x): return str(x).replace('.', '_')
 
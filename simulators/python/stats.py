@@ -0,0 +1,329 @@
+import collections
+import math
+
+from typing import Dict, Iterable, List, Tuple, Union
+
+
+"""
+Online summaries of trial results, updated chunk by chunk and mergeable, so
+the statistics of a run never need its full results in memory:
+
+    RunningStats    count, mean, variance (Welford / Chan), min, max
+    QuantileSketch  exact counts while few distinct values were seen, then a
+                    log-bucketed sketch with a bounded relative error
+    TrialStats      both of the above for every summarized column
+"""
+
+# Distinct values counted exactly before switching to the sketch
+EXACT_LIMIT = 4096
+
+# Relative error of the quantiles answered by the sketch
+RELATIVE_ACCURACY = 0.005
+
+COLUMNS = ('results', 'results_z', 'delta')
+
+
+class RunningStats:
+    """Count, mean and sum of squared deviations of a stream of numbers
+
+    Chunks are reduced on their own and combined with Chan's update of
+    Welford's algorithm, which is also how two accumulators are merged.
+    """
+
+    count: int
+    mean: float
+    m2: float  # Sum of squared deviations from the mean
+    min: Union[float, None]
+    max: Union[float, None]
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def _combine(self, count: int, mean: float, m2: float, low, high):
+        if count == 0:
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def update(self, values: Iterable[float]) -> 'RunningStats':
+        """Add a chunk of values in place"""
+        values = list(values)
+        if not values:
+            return self
+
+        mean = math.fsum(values) / len(values)
+        m2 = math.fsum((x - mean) ** 2 for x in values)
+        self._combine(len(values), mean, m2, min(values), max(values))
+        return self
+
+    def merge(self, *others: 'RunningStats') -> 'RunningStats':
+        for other in others:
+            self._combine(other.count, other.mean,
+                          other.m2, other.min, other.max)
+        return self
+
+    def variance(self, ddof: int = 1) -> float:
+        if self.count <= ddof:
+            return math.nan
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 1) -> float:
+        return math.sqrt(self.variance(ddof))
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RunningStats':
+        stats = cls()
+        stats.count = int(data['count'])
+        stats.mean = float(data['mean'])
+        stats.m2 = float(data['m2'])
+        stats.min = data['min']
+        stats.max = data['max']
+        return stats
+
+
+class QuantileSketch:
+    """Mergeable quantiles of a stream of integers
+
+    Values are counted exactly until more than `exact_limit` distinct ones
+    were seen, quantiles then match `np.quantile`. Past that positive values
+    are counted in buckets `(gamma^(i-1), gamma^i]` (as in DDSketch), so any
+    quantile is answered within `relative_accuracy` and the number of buckets
+    only grows with the logarithm of the largest value. Values below 1 (such
+    as zero deltas) are always counted exactly.
+    """
+
+    relative_accuracy: float
+    exact_limit: int
+
+    count: int
+    _exact: Union[collections.Counter, None]  # value -> count, None once sketched
+    _small: collections.Counter  # value < 1 -> count, sketch only
+    _buckets: collections.Counter  # bucket index -> count, sketch only
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, exact_limit: int = EXACT_LIMIT):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+
+        self.relative_accuracy = float(relative_accuracy)
+        self.exact_limit = int(exact_limit)
+        self._gamma = (1 + self.relative_accuracy) / \
+            (1 - self.relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+
+        self.count = 0
+        self._exact = collections.Counter()
+        self._small = collections.Counter()
+        self._buckets = collections.Counter()
+
+    @property
+    def exact(self) -> bool:
+        """Whether every value is still counted exactly"""
+        return self._exact is not None
+
+    def _bucket(self, value: int) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _add_sketch(self, counts: Dict[int, int]):
+        for value, count in counts.items():
+            if value < 1:
+                self._small[value] += count
+            else:
+                self._buckets[self._bucket(value)] += count
+
+    def _fold(self):
+        # Too many distinct values, move the exact counts to the sketch
+        exact, self._exact = self._exact, None
+        self._add_sketch(exact)
+
+    def _add_counts(self, counts: Dict[int, int]):
+        if self._exact is not None:
+            self._exact.update(counts)
+            if len(self._exact) > self.exact_limit:
+                self._fold()
+        else:
+            self._add_sketch(counts)
+        self.count += sum(counts.values())
+
+    def update(self, values: Iterable[int]) -> 'QuantileSketch':
+        """Add a chunk of values in place"""
+        self._add_counts(collections.Counter(values))
+        return self
+
+    def merge(self, *others: 'QuantileSketch') -> 'QuantileSketch':
+        for other in others:
+            if other.relative_accuracy != self.relative_accuracy:
+                raise ValueError("sketches must share relative_accuracy")
+
+            if other._exact is not None:
+                self._add_counts(other._exact)
+                continue
+
+            if self._exact is not None:
+                self._fold()
+            self._small.update(other._small)
+            self._buckets.update(other._buckets)
+            self.count += other.count
+
+        return self
+
+    def _sorted_counts(self) -> List[Tuple[float, int]]:
+        # (value or bucket estimate, count) in increasing order
+        if self._exact is not None:
+            return sorted(self._exact.items())
+
+        gamma = self._gamma
+        return sorted(self._small.items()) + [
+            (2 * gamma ** i / (gamma + 1), self._buckets[i]) for i in sorted(self._buckets)]
+
+    def quantile(self, q: Union[float, Iterable[float]]) -> Union[float, List[float]]:
+        """Quantiles with `np.quantile`'s linear interpolation between ranks"""
+        if self.count == 0:
+            raise ValueError("no values")
+
+        scalar = not isinstance(q, Iterable)
+        qs = [q] if scalar else list(q)
+        if any(not 0 <= x <= 1 for x in qs):
+            raise ValueError("quantiles must be in [0, 1]")
+
+        # Value at every needed rank, ranks in increasing order
+        positions = [x * (self.count - 1) for x in qs]
+        ranks = sorted({r for p in positions for r in (
+            math.floor(p), math.ceil(p))})
+        values = {}
+        counts = iter(self._sorted_counts())
+        seen = 0
+        value = None
+        for rank in ranks:
+            while seen <= rank:
+                value, count = next(counts)
+                seen += count
+            values[rank] = value
+
+        quantiles = []
+        for p in positions:
+            low, high = values[math.floor(p)], values[math.ceil(p)]
+            quantiles.append(low + (p - math.floor(p)) * (high - low))
+
+        return quantiles[0] if scalar else quantiles
+
+    def pmf(self) -> Tuple[List[int], List[float]]:
+        """Exact distribution `(values, probabilities)`, as `build_pmf` returns"""
+        if self._exact is None:
+            raise ValueError("too many distinct values, only quantiles are kept")
+
+        values = sorted(self._exact)
+        return values, [self._exact[v] / self.count for v in values]
+
+    def to_dict(self) -> dict:
+        data = {'relative_accuracy': self.relative_accuracy,
+                'exact_limit': self.exact_limit, 'count': self.count}
+        if self._exact is not None:
+            data['exact'] = sorted(self._exact.items())
+        else:
+            data['small'] = sorted(self._small.items())
+            data['buckets'] = sorted(self._buckets.items())
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'], data['exact_limit'])
+        sketch.count = int(data['count'])
+        if 'exact' in data:
+            sketch._exact.update({int(v): int(c) for v, c in data['exact']})
+        else:
+            sketch._exact = None
+            sketch._small.update({int(v): int(c) for v, c in data['small']})
+            sketch._buckets.update({int(i): int(c)
+                                   for i, c in data['buckets']})
+        return sketch
+
+
+class TrialStats:
+    """Online summary of `multiple_trials` results
+
+    Keeps a `RunningStats` and a `QuantileSketch` of `results`, `results_z`
+    and their difference `delta`, plus the number of censored trials. Workers
+    summarize their own chunks and the summaries are merged in trial order.
+    """
+
+    count: int
+    censored: int
+    moments: Dict[str, RunningStats]
+    quantiles: Dict[str, QuantileSketch]
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY, exact_limit: int = EXACT_LIMIT):
+        self.count = 0
+        self.censored = 0
+        self.moments = {column: RunningStats() for column in COLUMNS}
+        self.quantiles = {column: QuantileSketch(relative_accuracy, exact_limit)
+                          for column in COLUMNS}
+
+    def update(self, results: List[int], results_z: List[int],
+               censored: Union[List[bool], None] = None) -> 'TrialStats':
+        """Add a `(results, results_z, censored)` chunk in place"""
+        columns = {
+            'results': results,
+            'results_z': results_z,
+            'delta': [r - z for r, z in zip(results, results_z)],
+        }
+        for column, values in columns.items():
+            self.moments[column].update(values)
+            self.quantiles[column].update(values)
+
+        self.count += len(results)
+        if censored is not None:
+            self.censored += sum(censored)
+        return self
+
+    def merge(self, *others: 'TrialStats') -> 'TrialStats':
+        for other in others:
+            for column in COLUMNS:
+                self.moments[column].merge(other.moments[column])
+                self.quantiles[column].merge(other.quantiles[column])
+            self.count += other.count
+            self.censored += other.censored
+        return self
+
+    def mean(self, column: str = 'results') -> float:
+        return self.moments[column].mean
+
+    def std(self, column: str = 'results', ddof: int = 1) -> float:
+        return self.moments[column].std(ddof)
+
+    def quantile(self, q: Union[float, Iterable[float]], column: str = 'results'):
+        return self.quantiles[column].quantile(q)
+
+    def to_dict(self) -> dict:
+        """JSON-friendly state, restored by `from_dict`"""
+        return {
+            'count': self.count,
+            'censored': self.censored,
+            'moments': {c: m.to_dict() for c, m in self.moments.items()},
+            'quantiles': {c: q.to_dict() for c, q in self.quantiles.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TrialStats':
+        stats = cls()
+        stats.count = int(data['count'])
+        stats.censored = int(data['censored'])
+        stats.moments = {c: RunningStats.from_dict(m)
+                         for c, m in data['moments'].items()}
+        stats.quantiles = {c: QuantileSketch.from_dict(q)
+                           for c, q in data['quantiles'].items()}
+        return stats
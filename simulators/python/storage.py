@@ -0,0 +1,140 @@
+import array
+import json
+import os
+import shutil
+import sys
+
+from typing import Iterable, Tuple, Union
+
+
+"""
+Trials directory format:
+    meta.json      {'trial_count', 'configs', 'columns': {name: dtype}}
+    results.bin    raw little-endian int64 column
+    results_z.bin  raw little-endian int64 column
+    censored.bin   one byte per trial, 1 when cut at max_cycles or by a time budget
+
+Columns are only ever appended to; `meta.json` is atomically replaced after
+every append, so its `trial_count` always covers fully written rows.
+"""
+
+META_FILE = 'meta.json'
+COLUMNS = ('results', 'results_z', 'censored')
+COLUMN_DTYPE = '<i8'
+COLUMN_DTYPES = {'results': COLUMN_DTYPE,
+                 'results_z': COLUMN_DTYPE, 'censored': '|b1'}
+
+
+def dtype_itemsize(dtype: str) -> int:
+    # Item size of a '<i8' / '|b1' style dtype string
+    return int(dtype[2:])
+
+
+def write_json_atomic(path: str, data: dict):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class TrialsWriter:
+    path: str
+    configs: dict
+    trial_count: int
+
+    _files: dict
+
+    def __init__(self, path: str, configs: dict, resume: bool = False):
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.isfile(meta_path) and not resume:
+            raise FileExistsError(f"{path} already holds a trials dataset")
+
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.configs = configs
+        self.trial_count = 0
+
+        if os.path.isfile(meta_path):
+            # Append after the committed rows, dropping any partial ones
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta['configs'] != configs:
+                raise ValueError(f"{path} holds trials of other configs")
+            self.trial_count = int(meta['trial_count'])
+
+        self._files = {}
+        for name in COLUMNS:
+            # Columns missing from older datasets are zero-filled
+            f = open(os.path.join(path, f'{name}.bin'), 'ab')
+            f.truncate(self.trial_count * dtype_itemsize(COLUMN_DTYPES[name]))
+            self._files[name] = f
+        self._write_meta()
+
+    def _write_meta(self):
+        write_json_atomic(os.path.join(self.path, META_FILE), {
+            'trial_count': self.trial_count,
+            'configs': self.configs,
+            'columns': COLUMN_DTYPES,
+        })
+
+    def append(self, results: Iterable[int], results_z: Iterable[int],
+               censored: Union[Iterable[bool], None] = None):
+        columns = (array.array('q', results), array.array('q', results_z))
+        if len(columns[0]) != len(columns[1]):
+            raise ValueError("results and results_z must have the same length")
+
+        if censored is None:
+            censored = [False] * len(columns[0])
+        columns = (*columns, array.array('b', censored))
+        if len(columns[2]) != len(columns[0]):
+            raise ValueError("censored must have the same length as results")
+
+        for name, column in zip(COLUMNS, columns):
+            if sys.byteorder != 'little':
+                column.byteswap()
+            f = self._files[name]
+            f.write(column.tobytes())
+            f.flush()
+
+        self.trial_count += len(columns[0])
+        self._write_meta()
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_trials(path: str, configs: dict,
+                 chunks: Iterable[Tuple[list, ...]], replace: bool = False) -> int:
+    """Stream `(results, results_z[, censored])` chunks into a trials directory
+
+    With `replace` the trials are written next to `path` and only moved into
+    place once complete, replacing any dataset already there.
+    """
+    if not replace:
+        with TrialsWriter(path, configs) as writer:
+            for chunk in chunks:
+                writer.append(*chunk)
+
+            return writer.trial_count
+
+    path = path.rstrip(os.sep)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    old_path = f'{path}.{os.getpid()}.old'
+    try:
+        trial_count = write_trials(tmp_path, configs, chunks)
+
+        if os.path.isdir(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        return trial_count
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        shutil.rmtree(old_path, ignore_errors=True)
@@ -0,0 +1,197 @@
+import collections
+import multiprocessing
+
+import numpy as np
+
+from typing import Iterable, List, Tuple, Union
+
+if __package__:
+    from .counting import FailureBlocks
+    from .rng import TrialStreams
+    from .simulator import INF, trial_configs
+else:
+    # Run as a script or from `simulators/python` on sys.path
+    from counting import FailureBlocks
+    from rng import TrialStreams
+    from simulator import INF, trial_configs
+
+
+class SweepFactorySimulator(FailureBlocks):
+    """Infinite-spares simulator reporting a whole range of s0 in one pass.
+
+    As long as a system with `s0` spares is not critical every failed machine
+    is replaced on the spot, so every position (and its age) evolves exactly
+    as with infinitely many spares, and the system only differs by its idle
+    count `s0 - R(t)`, `R(t)` being the number of machines under repair.
+    The trial with `s0` spares therefore becomes critical at the first tick
+    with `R(t) > s0`, and its availability first drops below 0.2 at the first
+    tick with `(s0 - R(t)) / s0 < 0.2`: a single run of the infinite-spares
+    system yields both times for every `s0`, all sharing the same failures.
+    """
+
+    n: int  # Number of machines required for the system to work
+    p0: float  # Initial probability of failure
+    beta: float  # Failure increase rate
+    tr: int  # Machine recovery time
+
+    _rng: np.random.Generator
+    _clock: int
+
+    _run_begin: np.ndarray  # Per position, beta > 0 only
+    _repairs: collections.deque  # [repair_end, count]
+    _under_repair: int
+
+    def __init__(self, n: int, p0: float, tr: int, beta: float = 0.0,
+                 seed: int = int(1984), *args, **kwargs):
+        if n is None:
+            raise ValueError("n must not be None")
+        if p0 is None:
+            raise ValueError("p0 must not be None")
+        if beta is None:
+            raise ValueError("beta must not be None")
+        if tr is None:
+            raise ValueError("tr must not be None")
+        if p0 <= 0 and beta <= 0:
+            raise ValueError("machines never fail with p0 = 0 and beta = 0")
+
+        self.n = int(n)
+        self.p0 = float(p0)
+        self.beta = float(beta)
+        self.tr = int(tr)
+
+        self._clock = int(0)
+        self._rng = np.random.default_rng(seed)
+
+        self._run_begin = np.ones(self.n, dtype=np.int64)
+        self._repairs = collections.deque()
+        self._under_repair = 0
+
+        # Binomial failure blocks when beta == 0
+        self._reset_blocks()
+
+    def _next_failures(self) -> Tuple[int, int]:
+        if self.beta == 0:
+            # Machines are exchangeable, skip ticks without failures
+            return self._next_failure_tick()
+
+        clock = self._clock
+        while True:
+            clock += 1
+            p = self.p0 + self.beta * (clock - self._run_begin)
+            broken = self._rng.random(self.n) <= p
+
+            n_broken = int(np.count_nonzero(broken))
+            if n_broken > 0:
+                # Replacements start running on the failure tick
+                self._run_begin[broken] = clock
+                return clock, n_broken
+
+    def next_failure(self) -> int:
+        """Jump to the next tick with failures, returns the machines under repair"""
+        clock, n_broken = self._next_failures()
+        self._clock = clock
+
+        repairs = self._repairs
+        while repairs and repairs[0][0] <= clock:
+            self._under_repair -= repairs.popleft()[1]
+
+        # Repairs are checked from the next tick on, as in `next_state`
+        repair_time = max(self.tr, 1)
+        if repair_time < INF - clock:
+            repairs.append([clock + repair_time, n_broken])
+
+        self._under_repair += n_broken
+        return self._under_repair
+
+
+def low_availability_threshold(s0: int) -> int:
+    """Fewest machines under repair with an availability below 0.2 for `s0`"""
+    return next(r for r in range(s0 + 1) if (s0 - r) / s0 < 0.2)
+
+
+def sweep_trial(n: int, p0: float, s_values: Iterable[int], tr: int, beta: float = 0.0,
+                seed: int = int(1984), max_cycles: Union[int, None] = None) -> Tuple[List[int], List[int], List[bool]]:
+    """Time to critical and time to low availability for every `s0` in `s_values`,
+    spare counts still not critical after `max_cycles` ticks are censored"""
+    s_values = [int(s0) for s0 in s_values]
+    simulator = SweepFactorySimulator(n, p0, tr, beta, seed)
+
+    results = [0] * len(s_values)
+    results_z = [0] * len(s_values)
+    censored = [False] * len(s_values)
+
+    # (machines under repair reached, column, index), handled in order
+    thresholds = []
+    for i, s0 in enumerate(s_values):
+        thresholds.append((s0 + 1, results, i))
+        if s0 == 0:
+            # Without spares the availability is already low at the first tick
+            results_z[i] = 1
+        else:
+            thresholds.append((low_availability_threshold(s0), results_z, i))
+    thresholds.sort(key=lambda t: t[0])
+
+    reached = 0
+    pending = 0
+    while pending < len(thresholds):
+        under_repair = simulator.next_failure()
+        if max_cycles is not None and simulator._clock > max_cycles:
+            break
+
+        if under_repair <= reached:
+            continue
+
+        reached = under_repair
+        while pending < len(thresholds) and thresholds[pending][0] <= reached:
+            _, column, i = thresholds[pending]
+            column[i] = simulator._clock
+            pending += 1
+
+    # Past max_cycles, as in `factory_trial`
+    for _, column, i in thresholds[pending:]:
+        column[i] = max_cycles
+        if column is results:
+            censored[i] = True
+
+    return results, results_z, censored
+
+
+def sweep_chunk(args: tuple) -> Tuple[List[List[int]], List[List[int]], List[List[bool]]]:
+    n, p0, s_values, tr, beta, seed, start, stop, max_cycles = args
+    streams = TrialStreams(seed)
+    trials = [sweep_trial(n, p0, s_values, tr, beta, streams.stream(i), max_cycles)
+              for i in range(start, stop)]
+    return [t[0] for t in trials], [t[1] for t in trials], [t[2] for t in trials]
+
+
+def sweep_trials(trial_count: int, n: int, p0: float, s_values: Iterable[int], tr: int, beta: float, seed: int,
+                 parallel: bool = True, parallel_threshold: int = 1000, trial_offset: int = 0,
+                 max_cycles: Union[int, None] = None) -> dict:
+    """Run a multi-spare sweep, returns `{s0: multiple_trials-like data}`
+
+    Every trial is simulated once for all of `s_values`, so the datasets share
+    their random failures (common random numbers) and cost about one run.
+    """
+    s_values = [int(s0) for s0 in s_values]
+
+    chunk_size = max(1, -(-trial_count // (4 * multiprocessing.cpu_count())))
+    tasks = [(n, p0, s_values, tr, beta, seed, start, min(start + chunk_size, trial_offset + trial_count), max_cycles)
+             for start in range(trial_offset, trial_offset + trial_count, chunk_size)]
+
+    if parallel and trial_count >= parallel_threshold:
+        with multiprocessing.Pool() as pool:
+            chunks = pool.map(sweep_chunk, tasks)
+    else:
+        chunks = [sweep_chunk(task) for task in tasks]
+
+    data = {}
+    for j, s0 in enumerate(s_values):
+        data[s0] = {
+            'trial_count': trial_count,
+            'configs': trial_configs(n, p0, s0, tr, beta, seed, 'sweep', max_cycles),
+            'results': [trial[j] for chunk in chunks for trial in chunk[0]],
+            'results_z': [trial[j] for chunk in chunks for trial in chunk[1]],
+            'censored': [trial[j] for chunk in chunks for trial in chunk[2]],
+        }
+
+    return data
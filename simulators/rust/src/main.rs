@@ -197,6 +197,13 @@ fn main() {
     // Seed RNG
     let mut seed_generator = rand_pcg::Pcg64::seed_from_u64(seed);
 
+    // First trial index, the seeds of earlier trials are skipped so runs can be extended
+    let trial_offset: u128 = match env::var("SIM_TRIAL_OFFSET") {
+        Ok(v) => v.parse::<u128>().unwrap_or(0),
+        Err(..) => 0,
+    };
+    seed_generator.advance(trial_offset);
+
     let max_cycles: i64 = match env::var("SIM_MAX_CYCLES") {
         Ok(v) => v.parse::<i64>().unwrap_or(100000),
         Err(..) => 100000,